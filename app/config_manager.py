@@ -38,7 +38,7 @@ _KEYRING_SERVICE = "pdf_uploader"
 _KEYRING_KEY_NAME = "fernet_key"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class WatchedFolder:
     input_dir: str
     output_dir: str
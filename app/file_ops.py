@@ -1,52 +1,97 @@
 # app/file_ops.py -- File system operations (move, rename, increment filename).
 
 import os
+import re
 from time import sleep
 from traceback import print_exc
 
 import app.color_print as cp
 
 
+# Trailing " (n)" counter before the extension, e.g. "file (3).pdf"
+_COUNTER_RE = re.compile(r" \((\d+)\)$")
+
+
 def increment_filename(old_filename) -> str:
     """Increment a filename's numeric suffix, e.g. file.pdf -> file (1).pdf."""
-    for i in range(99, 0, -1):
-        old_suffix = f" ({i}).pdf"
-        new_suffix = f" ({i + 1}).pdf"
-        new_filename = old_filename.replace(old_suffix, new_suffix)
-        if new_filename != old_filename:
-            break
-    else:
-        new_filename = old_filename.replace(".pdf", " (1).pdf")
-    return new_filename
+    root, ext = os.path.splitext(old_filename)
+    match = _COUNTER_RE.search(root)
+    if match:
+        return f"{root[: match.start()]} ({int(match.group(1)) + 1}){ext}"
+    return f"{root} (1){ext}"
+
+
+def _discard_placeholder(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _rename_no_clobber(src, dst):
+    """Move *src* to *dst*, raising FileExistsError rather than overwrite *dst*.
+
+    The existence check and the move are one atomic step, so concurrent
+    workers can't claim the same name, and nothing appears at *dst* until
+    the file itself does.
+    """
+    if os.name == "nt":
+        os.rename(src, dst)  # Windows rename never replaces an existing file
+        return
+    try:
+        os.link(src, dst)
+    except (FileExistsError, FileNotFoundError):
+        raise
+    except OSError:
+        # No hard links here (e.g. across devices): claim the name exclusively
+        # and replace it at once, so the empty placeholder lives only for the
+        # duration of this one call.
+        fd = os.open(dst, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        os.close(fd)
+        try:
+            os.replace(src, dst)
+        except BaseException:
+            _discard_placeholder(dst)
+            raise
+        return
+    try:
+        os.remove(src)
+    except BaseException:
+        _discard_placeholder(dst)
+        raise
 
 
 def move_file(filepath, output_dir) -> str:
     """Move a file to the given directory, retrying on transient errors.
 
+    If a file with the same name already exists, the moved file gets a
+    numeric suffix (see ``increment_filename``).
+
     Returns the new file path on success. On failure, the *original*
     ``filepath`` is returned so callers always have a valid path.
 
     """
     file_name = os.path.basename(filepath)
     new_filepath = os.path.join(output_dir, file_name)
-    attempt = 0
-    while attempt < 50:  # Max number of rename attempts = 50
+
+    delay = 0.1
+    attempts = 0
+    while attempts < 50:  # Max number of rename attempts = 50
         try:
-            os.rename(filepath, new_filepath)
+            _rename_no_clobber(filepath, new_filepath)
             cp.green(f"Moved file to {os.path.relpath(new_filepath)}.")
             return new_filepath
-        except PermissionError as e:
-            cp.yellow(e)
-            attempt += 1
-            sleep(1)  # Wait 1 second before retrying
         except FileExistsError:
-            if attempt == 0:
-                print("Incrementing filename...", end="")
-            else:
-                print(".", end="")
-            print()
+            # Name taken (possibly by a concurrent worker): try the next one.
             new_filepath = increment_filename(new_filepath)
-            attempt += 1
+            attempts += 1
+        except PermissionError as e:
+            # Usually a transient lock (OneDrive sync, scanner still writing);
+            # back off briefly rather than a flat second per attempt.
+            cp.yellow(e)
+            attempts += 1
+            sleep(delay)
+            delay = min(delay * 2, 1)
         except FileNotFoundError as e:
             # This probably means the file was already moved by another process
             # (Perhaps another instance of this script is running?)
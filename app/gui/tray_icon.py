@@ -18,13 +18,15 @@ class TrayIcon(QSystemTrayIcon):
                 QStyle.StandardPixmap.SP_ComputerIcon
             )
         self.setIcon(icon)
-        self.setToolTip("PDF Uploader - Starting...")
+        self._last_tooltip = "PDF Uploader - Starting..."
+        self._last_status = "Status: Starting..."
+        self.setToolTip(self._last_tooltip)
 
         # Context menu
         menu = QMenu()
         menu.addAction("Show Window", self._show_window)
         menu.addSeparator()
-        self.status_action = menu.addAction("Status: Starting...")
+        self.status_action = menu.addAction(self._last_status)
         self.status_action.setEnabled(False)
         menu.addSeparator()
         menu.addAction("Settings...", main_window.open_settings)
@@ -86,7 +88,17 @@ class TrayIcon(QSystemTrayIcon):
         )
 
     def update_status(self, folder_count, files_today):
-        """Update the tray tooltip and status menu item."""
+        """Update the tray tooltip and status menu item.
+
+        Unchanged values are skipped: on Windows every ``setToolTip`` call
+        round-trips to the shell notification area.
+        """
         text = f"Watching {folder_count} folders | {files_today} processed today"
-        self.status_action.setText(f"Status: {text}")
-        self.setToolTip(f"PDF Uploader - {text}")
+        status = f"Status: {text}"
+        if status != self._last_status:
+            self.status_action.setText(status)
+            self._last_status = status
+        tooltip = f"PDF Uploader - {text}"
+        if tooltip != self._last_tooltip:
+            self.setToolTip(tooltip)
+            self._last_tooltip = tooltip
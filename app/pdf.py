@@ -1,16 +1,31 @@
 # /app/pdf.py
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pdf2image import convert_from_path
 from pypdf import PdfReader, PdfWriter
 from pytesseract import pytesseract, image_to_string
 from pypdfium2 import PdfDocument
 from app.config import tesseract_cmd_path
+from app.pdfium import pdfium_lock
 
 import app.color_print as cp
-from re import findall
+import re
 from traceback import print_exc
+import io
 import os
+import subprocess
 import sys
+import tempfile
+
+try:
+    # Optional in-process Tesseract API: keeps the model loaded across pages
+    # and avoids spawning a process per call. Falls back to pytesseract.
+    from tesserocr import PyTessBaseAPI, PSM
+except ImportError:
+    PyTessBaseAPI = None
+    PSM = None
 
 
 def open_with_debug(file_path, mode="r"):
@@ -30,79 +45,283 @@ except Exception as e:
     )
 
 WO_NUM_FORMAT = r"56561-\d{6}"
+_WO_RE = re.compile(WO_NUM_FORMAT)
+
+# Maximum concurrent tesseract processes per document (returns diminish past ~4).
+_OCR_MAX_WORKERS = min(4, os.cpu_count() or 1)
+# Pages per tesseract invocation: large enough to amortise model loading,
+# small enough that short documents still spread across the workers.
+_OCR_BATCH_SIZE = 4
+# Render resolution for OCR. Tesseract is most accurate around 300 DPI, but we
+# only need to pick work order numbers out of the text, which 200 DPI reads
+# reliably at under half the pixels.
+_OCR_DPI = 200
+# Pages with no text layer after which a document is treated as a scan.
+_TEXT_PROBE_PAGES = 2
+
+
+def open_tess_api(psm=None):
+    """Return a ``tesserocr.PyTessBaseAPI`` using the configured install's tessdata.
+
+    Callers must check ``PyTessBaseAPI is not None`` first and close the API
+    (it is a context manager) when done.
+    """
+    kwargs = {}
+    tessdata = os.path.join(os.path.dirname(tesseract_cmd_path), "tessdata")
+    if os.path.isdir(tessdata):
+        kwargs["path"] = tessdata + os.sep
+    if psm is not None:
+        kwargs["psm"] = psm
+    return PyTessBaseAPI(**kwargs)
+
+
+# pdfium is not thread-safe; share the app-wide lock with po_validator's renders.
+_pdfium_lock = pdfium_lock
 
 
 # Iterate over PDF files in directory
 def next(dirname):
-    for file in os.listdir(dirname):
-        filename = os.fsdecode(file)
-        if filename.lower().endswith(".pdf"):
-            fpath = os.path.join(dirname, filename)
-            yield fpath
-        else:
-            continue
+    with os.scandir(dirname) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith(".pdf") and entry.is_file():
+                yield entry.path
+
+
+class PdfHandle:
+    """A PDF opened once and shared by text extraction and OCR.
 
+    The pypdf reader and the pypdfium2 document are opened lazily; the
+    document reuses the bytes pypdf already read instead of reading the
+    file again. Use as a context manager, or call ``close()``.
+    """
 
-# Takes a PDF file path as input and converts the PDF into a list of PIL images, representing each page.
-def _pdf_to_img(pdf_file):
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._reader = None
+        self._document = None
+
+    @property
+    def reader(self) -> PdfReader:
+        if self._reader is None:
+            self._reader = PdfReader(self.filepath)
+        return self._reader
+
+    @property
+    def document(self) -> PdfDocument:
+        if self._document is None:
+            source = self.filepath
+            stream = getattr(self._reader, "stream", None)
+            if isinstance(stream, io.BytesIO):
+                source = stream.getvalue()
+            with _pdfium_lock:
+                self._document = PdfDocument(source)
+        return self._document
+
+    def close(self):
+        if self._document is not None:
+            with _pdfium_lock:
+                self._document.close()
+            self._document = None
+        self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _as_handle(pdf_file) -> tuple[PdfHandle, bool]:
+    """Return ``(handle, owned)``; *owned* handles must be closed by the caller."""
+    if isinstance(pdf_file, PdfHandle):
+        return pdf_file, False
+    return PdfHandle(pdf_file), True
+
+
+def _convert_with_pdf2image(filepath, dpi, **page_range) -> list:
+    """Render pages with pdf2image (poppler); returns [] if that fails too."""
+    cp.yellow(f"Using pdf2image to convert {os.path.basename(filepath)} to images.")
     try:
-        images = []
-        pdf = PdfDocument(pdf_file)  # Splits the PDF into pages
-        n_pages = len(pdf)  # Get number of pages
-        for page_number in range(n_pages):  # Loop through pages
-            page = pdf.get_page(page_number)  # Get page
-            pil_image = page.render(  # Render page
-                scale=1,  # 1 = 100% scale
-                rotation=0,  # 0 = 0 degrees rotation
-                crop=(0, 0, 0, 0),  # No crop
-            ).to_pil()  # Convert to PIL image
-            images.append(pil_image)  # Add to list
-            page.close()  # Close page
-        pdf.close()  # Close PDF
-        return images  # Return list of PIL images (one per page)
+        return convert_from_path(filepath, dpi=dpi, **page_range)
+    except Exception as fallback_error:
+        cp.red("Fallback conversion to images failed:")
+        cp.red(fallback_error)
+        print_exc()
+        return []
 
+
+# Takes a PDF file path (or PdfHandle) as input and yields a PIL image for each
+# page, so only the pages currently being OCR'd are held in memory. A page that
+# can't be rendered yields None, so page numbers stay aligned.
+def _pdf_to_img(pdf_file, dpi=_OCR_DPI):
+    handle, owned = _as_handle(pdf_file)
+    try:
+        with _pdfium_lock:
+            pdf = handle.document  # Splits the PDF into pages
+            n_pages = len(pdf)  # Get number of pages
     except Exception as e:
+        # PyPDFium2 can't open the file at all; fall back to pdf2image
         cp.red(e)
         print_exc()
+        if owned:
+            handle.close()
+        yield from _convert_with_pdf2image(handle.filepath, dpi)
+        return
+
+    try:
+        for page_number in range(n_pages):  # Loop through pages
+            try:
+                with _pdfium_lock:
+                    page = pdf.get_page(page_number)  # Get page
+                    try:
+                        pil_image = page.render(  # Render page
+                            scale=dpi / 72,  # PDF user space is 72 units per inch
+                            rotation=0,  # 0 = 0 degrees rotation
+                            crop=(0, 0, 0, 0),  # No crop
+                            grayscale=True,  # OCR needs no colour; to_pil() won't copy
+                        ).to_pil()  # Convert to PIL image
+                    finally:
+                        page.close()  # Close page
+            except Exception as e:
+                # One bad page shouldn't send the whole file through poppler
+                cp.yellow(f"PyPDFium2 failed on page {page_number + 1}: {e}")
+                images = _convert_with_pdf2image(
+                    handle.filepath,
+                    dpi,
+                    first_page=page_number + 1,
+                    last_page=page_number + 1,
+                )
+                pil_image = images[0] if images else None
+            yield pil_image
+    finally:
+        if owned:
+            handle.close()  # Close PDF
+
+
+def _run_tesseract_batch(images) -> list[str]:
+    """OCR several page images with a single tesseract process.
+
+    The page images are written to a temp directory and passed to tesseract
+    as an image-list file, so the engine and language model load only once.
+    Raises if the output can't be split back into one text per page.
+    """
+    with tempfile.TemporaryDirectory(prefix="pdf_ocr_") as tmpdir:
+        paths = []
+        for i, img in enumerate(images):
+            path = os.path.join(tmpdir, f"page_{i}.png")
+            img.save(path)
+            paths.append(path)
+        list_path = os.path.join(tmpdir, "list.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(paths) + "\n")
+        # CREATE_NO_WINDOW: see connectivity.ping_address
+        creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+        result = subprocess.run(
+            [pytesseract.tesseract_cmd, list_path, "stdout"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+            creationflags=creationflags,
+        )
+
+    # Pages are separated by form feeds; some tesseract versions also
+    # terminate the last page with one.
+    pages = result.stdout.decode("utf-8", errors="replace").split("\x0c")
+    if len(pages) == len(images) + 1 and not pages[-1].strip():
+        pages.pop()
+    if len(pages) != len(images):
+        raise ValueError(f"expected {len(images)} pages of text, got {len(pages)}")
+    return pages
+
+
+def _ocr_batch(images) -> list[str]:
+    """OCR a batch of page images, returning one text string per page.
+
+    Pages that couldn't be rendered (``None``) come back as empty text.
+    """
+    rendered = [img for img in images if img is not None]
+    texts = _ocr_images(rendered) if rendered else []
+    if len(rendered) == len(images):
+        return texts
+    texts.reverse()
+    return [texts.pop() if img is not None else "" for img in images]
+
+
+def _ocr_images(images) -> list[str]:
+    """OCR page images, trying tesserocr, one tesseract run, then page by page."""
+    if PyTessBaseAPI is not None:
         try:
-            # Fallback option: Use pdf2image library
-            cp.yellow(
-                f"PyPDFium2 failed. Using pdf2image to convert {os.path.basename(pdf_file)} to images."
-            )
-            images = convert_from_path(pdf_file)
-            return images
-        except Exception as fallback_error:
-            cp.red("Fallback conversion to images failed:")
-            cp.red(fallback_error)
-            print_exc()
-    return []
+            # One API per batch (and so per worker thread); tesserocr releases
+            # the GIL while recognising, so batches still run concurrently.
+            with open_tess_api() as api:
+                texts = []
+                for img in images:
+                    api.SetImage(img)
+                    texts.append(api.GetUTF8Text())
+                return texts
+        except Exception as e:
+            cp.yellow(f"tesserocr failed ({e}). Falling back to tesseract CLI.")
+    if len(images) == 1:
+        return [image_to_string(images[0])]
+    try:
+        return _run_tesseract_batch(images)
+    except Exception as e:
+        cp.yellow(f"Batch OCR failed ({e}). Falling back to OCR page by page.")
+        return [image_to_string(img) for img in images]
 
 
 # extract text from pdf using tesseract OCR
 def tesseractOcr(pdf_file):
-    images = _pdf_to_img(pdf_file)  # Get list of PIL images
-    text = []
-    for pg, img in enumerate(images):  # Loop through images
-        page_text = image_to_string(img)  # OCR image
-        text.append(page_text)  # Append to list
-    return text  # Return text string of all pages
+    pages = iter(_pdf_to_img(pdf_file))  # PIL images, rendered lazily
+    # Pull contiguous batches of pages off the renderer: each batch is one
+    # tesseract API/process, and batches run concurrently (threads suffice
+    # because the work happens outside the GIL). At most one batch per worker
+    # is in flight, so memory stays bounded on very long documents.
+    texts: list[str] = []
+    with ThreadPoolExecutor(
+        max_workers=_OCR_MAX_WORKERS, thread_name_prefix="ocr"
+    ) as pool:
+        in_flight: deque = deque()
+        for batch in iter(lambda: list(islice(pages, _OCR_BATCH_SIZE)), []):
+            if len(in_flight) >= _OCR_MAX_WORKERS:
+                texts.extend(in_flight.popleft().result())
+            in_flight.append(pool.submit(_ocr_batch, batch))
+        # Collect in submission order, so pages come back in document order
+        while in_flight:
+            texts.extend(in_flight.popleft().result())
+    return texts
 
 
-# extract text from pdf
-def extract(filepath):
+# extract text from pdf (a file path or an open PdfHandle)
+def extract(pdf_file):
+    handle, owned = _as_handle(pdf_file)
+    try:
+        return _extract(handle)
+    finally:
+        if owned:
+            handle.close()
+
+
+def _extract(handle):
+    filepath = handle.filepath
     text = []
     # cp.white(f"Scanning {filepath} for text...")
 
     try:
-        reader = PdfReader(filepath)
-        for page in reader.pages:
+        reader = handle.reader
+        for page_index, page in enumerate(reader.pages):
             text.append(page.extract_text())
+            # Scanned documents have no text layer at all; don't parse every
+            # page before falling back to OCR.
+            if page_index + 1 >= _TEXT_PROBE_PAGES and not any(text):
+                text = []
+                break
     except Exception as e:
         cp.white(e)
     try:
         if text == [] or all([not t for t in text]):
             cp.yellow(f"PyPDF2 failed. Using OCR to extract text from {filepath}.")
-            text = tesseractOcr(filepath)
+            text = tesseractOcr(handle)
         else:
             cp.white(f"Used PyPDF2 to extract text from {filepath}.")
     except Exception as e:
@@ -118,8 +337,8 @@ def create_child_pdf(filepath, pg_nums, output_path):
         with open_with_debug(filepath, "rb") as pdf_file:
             pdf_reader = PdfReader(pdf_file)
             pdf_writer = PdfWriter()
-            for page_num in pg_nums:
-                pdf_writer.add_page(pdf_reader.pages[page_num])
+            # pg_nums is a set; sort so the child keeps the original page order
+            pdf_writer.append(pdf_reader, pages=sorted(pg_nums), import_outline=False)
             with open_with_debug(output_path, "wb") as output:
                 pdf_writer.write(output)
     except Exception as e:
@@ -129,20 +348,21 @@ def create_child_pdf(filepath, pg_nums, output_path):
 # extract work orders from pdf, create a set of pages for each work order
 # append pages with no work order to the previous work order.
 def workorders(filepath) -> dict[str, set[int]]:
-    order_number = ""
-    fileorders = findall(WO_NUM_FORMAT, filepath)  # Find order numbers in file name
+    # Use order number(s) from file name if found (skips text extraction and
+    # OCR). Most files have none, so probe with search() before collecting.
+    if _WO_RE.search(filepath):
+        return {wo: set() for wo in _WO_RE.findall(filepath)}
 
-    # Use order number from file name if found
-    if fileorders:
-        return {wo: set() for wo in fileorders}
+    order_number = ""
 
-    pages = extract(filepath)  # Get list of text from PDF
+    with PdfHandle(filepath) as handle:
+        pages = extract(handle)  # Get list of text from PDF
     scannedorders: dict[str, set[int]] = {}  # Create empty dictionary for order numbers
     for page_index, page in enumerate(pages):
-        order_numbers = findall(WO_NUM_FORMAT, page)  # Find order numbers in page
+        match = _WO_RE.search(page)  # Find first order number in page
         # Use new order number if found
-        if order_numbers != []:
-            order_number = order_numbers[0]
+        if match:
+            order_number = match.group()
         else:
             # Skip pages without order numbers
             if order_number == "":
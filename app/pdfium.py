@@ -0,0 +1,13 @@
+"""
+pdfium.py -- Process-wide lock for pdfium.
+
+pdfium is not thread-safe, and several PDFs are processed at once by the job
+queue workers.  Both the OCR renders in ``app.pdf`` and the Gemini page
+images in ``app.po_validator`` (pdfplumber's ``page.to_image`` uses
+pypdfium2) go through pdfium, so every pypdfium2 call in the app must hold
+this one lock.
+"""
+
+import threading
+
+pdfium_lock = threading.RLock()
@@ -19,18 +19,30 @@ Usage from pdf_uploader:
 
 from __future__ import annotations
 
+import functools
 import io
 import logging
 import re
+from array import array
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz  # PyMuPDF
+import numpy as np
 import pdfplumber
 
 from .annotator import annotate_pdf
-from .extractor import extract_po_data
+from .extractor import (
+    extract_po_data,
+    extract_with_pdfplumber,
+    open_pdf,
+    start_speculative_render,
+)
 from .models import (
     LineAnnotation,
     MissingWorkItem,
+    POExtraction,
     POLineItem,
-    PriceMatchCandidate,
     PriceMismatch,
     ValidationResult,
     WorkItemData,
@@ -42,6 +54,38 @@ logger = logging.getLogger(__name__)
 # Tolerance for price comparison (±)
 PRICE_TOLERANCE = 0.01
 
+# Page-1 phrases that mark our own outbound price-update requests.
+_SKIP_RE = re.compile(
+    r"^(?=.*order\s+price\s+update)(?=.*request\s+for\s+po)", re.I | re.S
+)
+
+# Parenthetical suffixes on serial numbers, e.g. "Q-77 (old)"
+_PAREN_RE = re.compile(r"\s*\([^)]*\)")
+
+
+def _first_page_text(pdf_content: bytes, doc: fitz.Document | None = None) -> str:
+    """Return page-1 text, via MuPDF when possible and pdfplumber otherwise.
+
+    *doc* is an already-open MuPDF document for *pdf_content*, if any.
+    """
+    try:
+        if doc is not None:
+            return doc[0].get_text("text", flags=0) if doc.page_count else ""
+        with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+            return doc[0].get_text("text", flags=0) if doc.page_count else ""
+    except Exception:
+        logger.debug("MuPDF could not read page 1; falling back to pdfplumber")
+    with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
+        return (pdf.pages[0].extract_text() or "") if pdf.pages else ""
+
+
+def _quick_skip_check(pdf_content: bytes, doc: fitz.Document | None = None) -> bool:
+    """Return True if the PDF is an outbound price-update request."""
+    try:
+        return _SKIP_RE.search(_first_page_text(pdf_content, doc)) is not None
+    except Exception:
+        return False  # If quick check fails, proceed with normal extraction
+
 
 def _search_text_for(item: POLineItem, wi_serial: str | None = None) -> str:
     """Build fallback search text for a PO line item.
@@ -56,25 +100,78 @@ def _search_text_for(item: POLineItem, wi_serial: str | None = None) -> str:
     return item.description or ""
 
 
+@functools.lru_cache(maxsize=2048)
 def _normalise_sn(sn: str) -> str:
     """Normalise a serial number for matching: uppercase, strip whitespace."""
     return sn.strip().upper().replace("-", "").replace(" ", "")
 
 
-def _match_sn(sn1: str, sn2: str) -> bool:
-    """Fuzzy-match two serial numbers (ignore case, dashes, spaces, leading zeros)."""
-    a = _normalise_sn(sn1)
-    b = _normalise_sn(sn2)
-    if a == b:
-        return True
-    # Try stripping leading zeros
-    if a.lstrip("0") == b.lstrip("0"):
-        return True
-    # Check if one contains the other (partial match)
-    if len(a) >= 4 and len(b) >= 4:
-        if a in b or b in a:
-            return True
-    return False
+def _sn_keys(sn: str) -> tuple[str, str]:
+    """Return the normalised S/N and the same with leading zeros stripped."""
+    key = _normalise_sn(sn)
+    return key, key.lstrip("0")
+
+
+class _SnIndex:
+    """PO line indices keyed for serial-number matching.
+
+    Serial numbers match ignoring case, dashes, spaces and leading zeros;
+    failing that, one containing the other matches when both are at least
+    4 characters long.
+    """
+
+    def __init__(self, po_keys: list[tuple[str, str] | None]):
+        # Both S/N keys are indexed so exact and leading-zero matches are
+        # dict lookups.
+        self.by_key: dict[str, list[int]] = defaultdict(list)
+        self.by_stripped_key: dict[str, list[int]] = defaultdict(list)
+        for po_idx, keys in enumerate(po_keys):
+            if keys is not None:
+                self.by_key[keys[0]].append(po_idx)
+                self.by_stripped_key[keys[1]].append(po_idx)
+        # Keys long enough to take part in the partial (substring) rule
+        self.partial_keys = [
+            (po_idx, keys[0])
+            for po_idx, keys in enumerate(po_keys)
+            if keys is not None and len(keys[0]) >= 4
+        ]
+
+    def matches(self, keys: tuple[str, str]) -> set[int]:
+        """Return the indices of PO lines matching ``_sn_keys`` *keys*."""
+        po_idxs = set(self.by_key.get(keys[0], ()))
+        po_idxs.update(self.by_stripped_key.get(keys[1], ()))
+        if not po_idxs and len(keys[0]) >= 4:
+            # No exact hit: fall back to the partial (substring) match sweep.
+            key = keys[0]
+            po_idxs = {
+                po_idx
+                for po_idx, po_key in self.partial_keys
+                if po_key in key or key in po_key
+            }
+        return po_idxs
+
+
+def _run_tier1(
+    pdf_content: bytes,
+) -> tuple[pdfplumber.PDF | None, POExtraction | None]:
+    """Open the PDF and run Tier 1, keeping the handle for a Tier 2 render."""
+    pdf = open_pdf(pdf_content)
+    if pdf is None:
+        return None, None
+    try:
+        return pdf, extract_with_pdfplumber(pdf_content, pdf=pdf)
+    except BaseException:
+        pdf.close()
+        raise
+
+
+def _close_tier1_pdf(future) -> None:
+    """Done-callback closing the handle of a Tier 1 run nobody collected."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    pdf, _ = future.result()
+    if pdf is not None:
+        pdf.close()
 
 
 def validate(
@@ -82,6 +179,7 @@ def validate(
     service_order_id: int,
     work_items: list,
     document_name: str = "",
+    fitz_doc: fitz.Document | None = None,
 ) -> ValidationResult:
     """
     Extract line items from a PO PDF and compare prices against
@@ -96,6 +194,8 @@ def validate(
         service_order_id: Qualer service order ID.
         work_items: List of Qualer work item objects (SDK models).
         document_name: Original filename for reporting.
+        fitz_doc: Optional already-open PyMuPDF document for *pdf_content*,
+            reused for the page-1 quick check.
 
     Returns a ValidationResult with status:
       - "pass"               all prices match and no items missing
@@ -115,14 +215,18 @@ def validate(
     # Normalise SDK models into WorkItemData for clean attribute access.
     items = [WorkItemData.from_sdk_model(wi) for wi in work_items]
 
-    # Build a list of (normalised_key, work_item) for items with S/Ns.
+    # Build a list of (normalised_keys, work_item) for items with S/Ns.
     # Uses a list (not a dict) so duplicate S/Ns are preserved.
-    wi_entries: list[tuple[str, WorkItemData]] = []
+    wi_entries: list[tuple[tuple[str, str], WorkItemData]] = []
+    # Checked once so the loop skips the comparison and the log-call
+    # argument packing when INFO logging is off.
+    log_charge_diffs = logger.isEnabledFor(logging.INFO)
     for wi in items:
         if wi.serial_number:
-            wi_entries.append((_normalise_sn(wi.serial_number), wi))
+            wi_entries.append((_sn_keys(wi.serial_number), wi))
         if (
-            wi.service_charge is not None
+            log_charge_diffs
+            and wi.service_charge is not None
             and wi.service_total is not None
             and wi.service_charge != wi.service_total
         ):
@@ -134,28 +238,37 @@ def validate(
                 wi.service_total,
             )
 
+    # Start Tier 1 extraction in the background while the quick check
+    # below re-reads page 1; only the free pdfplumber tier is overlapped so
+    # a skipped document never triggers an LLM call.
+    tier1_pool = ThreadPoolExecutor(max_workers=1)
+    tier1 = tier1_pool.submit(_run_tier1, pdf_content)
+    tier1_pool.shutdown(wait=False)
+    rendered = start_speculative_render(pdf_content)
+
     # ---- Quick content check: skip outbound price-update requests ----
-    try:
-        with pdfplumber.open(io.BytesIO(pdf_content)) as _quick_pdf:
-            _first_text = (
-                (_quick_pdf.pages[0].extract_text() or "") if _quick_pdf.pages else ""
-            )
-        if (
-            "order price update" in _first_text.lower()
-            and "request for po" in _first_text.lower()
-        ):
-            logger.info("Skipping price-update request (detected in PDF content)")
-            return ValidationResult(
-                document_name=document_name,
-                service_order_id=service_order_id,
-                status="skipped",
-                notes="Document is an outbound price-update request, not a customer PO",
-            )
-    except Exception:
-        pass  # If quick check fails, proceed with normal extraction
+    if _quick_skip_check(pdf_content, fitz_doc):
+        logger.info("Skipping price-update request (detected in PDF content)")
+        if not tier1.cancel():
+            tier1.add_done_callback(_close_tier1_pdf)
+        if rendered is not None:
+            rendered.cancel()
+        return ValidationResult(
+            document_name=document_name,
+            service_order_id=service_order_id,
+            status="skipped",
+            notes="Document is an outbound price-update request, not a customer PO",
+        )
 
     # ---- Extract PO data from PDF ----
-    extraction = extract_po_data(pdf_content)
+    plumber_pdf, table_result = tier1.result()
+    try:
+        extraction = extract_po_data(
+            pdf_content, table_result=table_result, pdf=plumber_pdf, rendered=rendered
+        )
+    finally:
+        if plumber_pdf is not None:
+            plumber_pdf.close()
 
     if not extraction.line_items:
         return ValidationResult(
@@ -169,11 +282,23 @@ def validate(
             notes="No line items could be extracted from PO",
         )
 
+    # ---- One pass over the PO lines: price, S/N keys and description ----
+    # Parallel lists indexed like extraction.line_items.
+    po_prices: list[float | None] = []
+    po_keys: list[tuple[str, str] | None] = []
+    descs: list[str] = []
+    descs_lower: list[str] = []
+    for item in extraction.line_items:
+        po_prices.append(
+            item.unit_price if item.unit_price is not None else item.extended_price
+        )
+        po_keys.append(_sn_keys(item.serial_number) if item.serial_number else None)
+        desc = item.description or ""
+        descs.append(desc)
+        descs_lower.append(desc.lower())
+
     # ---- Check if the PO contains any pricing at all ----
-    has_any_price = any(
-        item.unit_price is not None or item.extended_price is not None
-        for item in extraction.line_items
-    )
+    has_any_price = any(price is not None for price in po_prices)
     if not has_any_price:
         return ValidationResult(
             document_name=document_name,
@@ -187,12 +312,11 @@ def validate(
             notes="PO contains no pricing — acceptable per policy",
         )
 
-    # ---- Helper: get price from a work item or PO line ----
-    def _wi_price(wi: WorkItemData) -> float | None:
-        return wi.service_charge if wi.service_charge is not None else wi.service_total
-
-    def _po_price(item: POLineItem) -> float | None:
-        return item.unit_price if item.unit_price is not None else item.extended_price
+    # ---- Resolve each work item price once ----
+    wi_prices: list[float | None] = [
+        wi.service_charge if wi.service_charge is not None else wi.service_total
+        for _keys, wi in wi_entries
+    ]
 
     # ==================================================================
     # Phase 1 — Match by S/N using elimination (best price match first)
@@ -201,43 +325,77 @@ def validate(
     annotations: list[LineAnnotation] = []
     checked = 0
     matched_count = 0
-    matched_wi_idxs: set[int] = set()  # indices into wi_entries
-    matched_po_idxs: set[int] = set()  # indices into extraction.line_items
-
-    candidates: list[PriceMatchCandidate] = []
-    for wi_idx, (wi_key, wi) in enumerate(wi_entries):
-        expected = _wi_price(wi)
-        if expected is None:
+    # Byte flags rather than sets or NumPy masks: scalar indexing a
+    # bytearray avoids both hashing and NumPy scalar boxing.
+    wi_used = bytearray(len(wi_entries))  # indexed like wi_entries
+    po_used = bytearray(len(extraction.line_items))  # like line_items
+
+    sn_index = _SnIndex(po_keys)
+
+    # Fast path: a work item and PO line that are each other's only exact
+    # S/N match, with agreeing prices, cannot be paired better by ranking.
+    wi_key_counts = Counter(wi_keys[0] for wi_keys, _wi in wi_entries)
+    for wi_idx, (wi_keys, wi) in enumerate(wi_entries):
+        exact = sn_index.by_key.get(wi_keys[0])
+        if exact is None or len(exact) != 1 or wi_key_counts[wi_keys[0]] != 1:
             continue
-        for po_idx, po_item in enumerate(extraction.line_items):
-            if not po_item.serial_number:
-                continue
-            if not _match_sn(po_item.serial_number, wi_key):
-                continue
-            po_p = _po_price(po_item)
-            if po_p is None:
-                continue
-            candidates.append(
-                PriceMatchCandidate(
-                    price_diff=abs(po_p - expected),
-                    wi_idx=wi_idx,
-                    po_idx=po_idx,
-                    expected_price=expected,
-                    po_price=po_p,
-                )
+        po_idx = exact[0]
+        expected = wi_prices[wi_idx]
+        po_p = po_prices[po_idx]
+        if expected is None or po_p is None or abs(po_p - expected) > PRICE_TOLERANCE:
+            continue
+        wi_used[wi_idx] = 1
+        po_used[po_idx] = 1
+        checked += 1
+        matched_count += 1
+        po_item = extraction.line_items[po_idx]
+        annotations.append(
+            LineAnnotation(
+                status="ok",
+                comment="",
+                page_number=po_item.page_number,
+                bbox=po_item.bbox,
+                search_text=_search_text_for(po_item, wi.serial_number),
             )
+        )
 
-    candidates.sort()  # smallest price difference first
-
-    for c in candidates:
-        if c.wi_idx in matched_wi_idxs or c.po_idx in matched_po_idxs:
+    # Candidate (work item, PO line) pairs, as parallel typed arrays
+    cand_diffs = array("d")
+    cand_wi_idxs = array("i")
+    cand_po_idxs = array("i")
+    for wi_idx, (wi_keys, wi) in enumerate(wi_entries):
+        expected = wi_prices[wi_idx]
+        if expected is None or wi_used[wi_idx]:
             continue
-        matched_wi_idxs.add(c.wi_idx)
-        matched_po_idxs.add(c.po_idx)
-        wi = wi_entries[c.wi_idx][1]
-        po_item = extraction.line_items[c.po_idx]
+        for po_idx in sorted(sn_index.matches(wi_keys)):
+            po_p = po_prices[po_idx]
+            if po_p is None or po_used[po_idx]:
+                continue
+            cand_diffs.append(abs(po_p - expected))
+            cand_wi_idxs.append(wi_idx)
+            cand_po_idxs.append(po_idx)
+
+    # Smallest price difference first; the stable sort keeps ties in
+    # (work item, PO line) order.
+    order: list[int] = []
+    if cand_diffs:
+        diffs = np.frombuffer(cand_diffs, dtype=np.float64)
+        order = np.argsort(diffs, kind="stable").tolist()
+    for i in order:
+        wi_idx = cand_wi_idxs[i]
+        po_idx = cand_po_idxs[i]
+        if wi_used[wi_idx] or po_used[po_idx]:
+            continue
+        wi_used[wi_idx] = 1
+        po_used[po_idx] = 1
+        wi = wi_entries[wi_idx][1]
+        po_item = extraction.line_items[po_idx]
+        expected_price = wi_prices[wi_idx]
+        po_price = po_prices[po_idx]
+        if expected_price is None or po_price is None:
+            continue  # unreachable: filtered when collecting candidates
         checked += 1
-        diff = c.po_price - c.expected_price
+        diff = po_price - expected_price
         if abs(diff) <= PRICE_TOLERANCE:
             matched_count += 1
             annotations.append(
@@ -253,8 +411,8 @@ def validate(
             mismatches.append(
                 PriceMismatch(
                     serial_number=po_item.serial_number or wi.serial_number,
-                    po_price=c.po_price,
-                    expected_price=c.expected_price,
+                    po_price=po_price,
+                    expected_price=expected_price,
                     difference=round(diff, 2),
                     description=po_item.description,
                     work_item_id=wi.work_item_id,
@@ -263,7 +421,7 @@ def validate(
             annotations.append(
                 LineAnnotation(
                     status="mismatch",
-                    comment=f"Expected ${c.expected_price:,.2f}, PO says ${c.po_price:,.2f}",
+                    comment=f"Expected ${expected_price:,.2f}, PO says ${po_price:,.2f}",
                     page_number=po_item.page_number,
                     bbox=po_item.bbox,
                     search_text=_search_text_for(po_item, wi.serial_number),
@@ -274,47 +432,45 @@ def validate(
     # Phase 2 — Fallback: match remaining work items by text/description
     # ==================================================================
     raw_text = extraction.raw_text or ""
+    # Lower-case the raw text once rather than once per work item
+    raw_lower = raw_text.lower()
+
+    for wi_idx, (_wi_keys, wi) in enumerate(wi_entries):
+        if wi_used[wi_idx]:
+            continue
 
-    for wi_idx, (wi_key, wi) in enumerate(wi_entries):
-        if wi_idx in matched_wi_idxs:
+        expected = wi_prices[wi_idx]
+        if expected is None:
             continue
 
         sn_str = wi.serial_number
-        asset = wi.asset_name
+        asset_lower = wi.asset_name.lower()
 
         # Build search variants: original S/N + version without parenthetical
-        sn_variants = [sn_str] if sn_str else []
-        base_sn = re.sub(r"\s*\([^)]*\)", "", sn_str).strip()
+        base_sn = _PAREN_RE.sub("", sn_str).strip()
         if base_sn and base_sn != sn_str:
-            sn_variants.append(base_sn)
+            sn_variants: tuple[str, ...] = (sn_str, base_sn)
+        else:
+            sn_variants = (sn_str,) if sn_str else ()
 
         # Search raw text
-        found_in_text = any(v in raw_text for v in sn_variants) or (
-            asset and asset.lower() in raw_text.lower()
+        found_in_text = any(v in raw_text for v in sn_variants) or bool(
+            asset_lower and asset_lower in raw_lower
         )
         # Also search PO line item descriptions
         if not found_in_text:
-            for po_item in extraction.line_items:
-                desc = po_item.description or ""
-                if any(v in desc for v in sn_variants) or (
-                    asset and asset.lower() in desc.lower()
-                ):
-                    found_in_text = True
-                    break
+            found_in_text = any(
+                any(v in desc for v in sn_variants)
+                or bool(asset_lower and asset_lower in desc_lower)
+                for desc, desc_lower in zip(descs, descs_lower)
+            )
         if not found_in_text:
             continue
 
-        expected = _wi_price(wi)
-        if expected is None:
-            continue
-
         best_po_idx: int | None = None
         best_diff: float = float("inf")
-        for po_idx, po_item in enumerate(extraction.line_items):
-            if po_idx in matched_po_idxs:
-                continue
-            po_p = _po_price(po_item)
-            if po_p is None:
+        for po_idx, po_p in enumerate(po_prices):
+            if po_used[po_idx] or po_p is None:
                 continue
             d = abs(po_p - expected)
             if d < best_diff:
@@ -322,12 +478,12 @@ def validate(
                 best_po_idx = po_idx
 
         if best_po_idx is not None:
-            matched_wi_idxs.add(wi_idx)
-            matched_po_idxs.add(best_po_idx)
+            wi_used[wi_idx] = 1
+            po_used[best_po_idx] = 1
             po_item = extraction.line_items[best_po_idx]
-            po_p = _po_price(po_item)
+            po_p = po_prices[best_po_idx]
             if po_p is None:
-                # Safeguard: _po_price should not return None here because None values
+                # Safeguard: the price should not be None here because None values
                 # were filtered out when computing best_po_idx, but enforce this
                 # invariant without relying on assertions that may be disabled.
                 continue
@@ -367,22 +523,22 @@ def validate(
 
     # ---- Check for Qualer work items missing from the PO ----
     missing_items: list[MissingWorkItem] = []
-    for wi_idx, (_wi_key, wi) in enumerate(wi_entries):
-        if wi_idx not in matched_wi_idxs:
+    for wi_idx, (_wi_keys, wi) in enumerate(wi_entries):
+        if not wi_used[wi_idx]:
             missing_items.append(
                 MissingWorkItem(
                     work_item_id=wi.work_item_id,
                     serial_number=wi.serial_number,
                     asset_name=wi.asset_name,
-                    expected_price=_wi_price(wi),
+                    expected_price=wi_prices[wi_idx],
                 )
             )
 
     # ---- Unverified annotations for unmatched PO line items ----
     for po_idx, po_item in enumerate(extraction.line_items):
-        if po_idx not in matched_po_idxs:
+        if not po_used[po_idx]:
             # Only annotate items that have a price (skip travel/misc)
-            if _po_price(po_item) is not None:
+            if po_prices[po_idx] is not None:
                 annotations.append(
                     LineAnnotation(
                         status="unverified",
@@ -442,24 +598,36 @@ def validate_and_annotate(
         A tuple of (annotated_pdf_bytes, output_filename, ValidationResult).
         annotated_pdf_bytes is None if annotation fails or the document was skipped.
     """
-    # Validate
-    result = validate(
-        pdf_content=pdf_bytes,
-        service_order_id=service_order_id,
-        work_items=work_items,
-        document_name=document_name,
-    )
-
-    print_result(result)
-
-    if result.status == "skipped":
-        return None, "", result
-
-    # Annotate
+    # Open the PDF once with PyMuPDF; the quick check and the annotator
+    # both work from this document instead of re-parsing the bytes.
     try:
-        annotated_bytes, annotated_name = annotate_pdf(pdf_bytes, result)
-        logger.info("Annotated PDF generated: %s", annotated_name)
-        return annotated_bytes, annotated_name, result
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
     except Exception:
-        logger.exception("Failed to annotate %s", document_name)
-        return None, "", result
+        doc = None  # each step falls back to parsing the bytes itself
+
+    try:
+        # Validate
+        result = validate(
+            pdf_content=pdf_bytes,
+            service_order_id=service_order_id,
+            work_items=work_items,
+            document_name=document_name,
+            fitz_doc=doc,
+        )
+
+        print_result(result)
+
+        if result.status == "skipped":
+            return None, "", result
+
+        # Annotate
+        try:
+            annotated_bytes, annotated_name = annotate_pdf(pdf_bytes, result, doc=doc)
+            logger.info("Annotated PDF generated: %s", annotated_name)
+            return annotated_bytes, annotated_name, result
+        except Exception:
+            logger.exception("Failed to annotate %s", document_name)
+            return None, "", result
+    finally:
+        if doc is not None:
+            doc.close()
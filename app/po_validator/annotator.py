@@ -8,14 +8,18 @@ image (Approved / Rejected / Inconclusive).
 
 from __future__ import annotations
 
+import functools
 import logging
 import os as _os
 import sys
+from bisect import bisect_right
+from collections import defaultdict
+from operator import itemgetter
 from pathlib import Path
 from typing import Literal
 import fitz  # PyMuPDF
 
-from .models import ValidationResult
+from .models import LineAnnotation, ValidationResult
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +46,17 @@ _STAMP_FILES: dict[str, Path] = {
     "INCONCLUSIVE": _STAMPS_DIR / "Inconclusive_stamp.png",
 }
 
+
+@functools.lru_cache(maxsize=None)
+def _stamp_pixmap(outcome: str) -> tuple[fitz.Pixmap, int, int] | None:
+    """Decode the stamp image for *outcome* once; ``None`` if it is missing."""
+    stamp_path = _STAMP_FILES.get(outcome)
+    if not stamp_path or not stamp_path.exists():
+        return None
+    pm = fitz.Pixmap(str(stamp_path))
+    return pm, pm.width, pm.height
+
+
 # Font for Unicode symbols (⚠) — Segoe UI Symbol ships with Windows
 _SYMBOL_FONT = _os.path.join(
     _os.environ.get("WINDIR", r"C:\Windows"), "Fonts", "seguisym.ttf"
@@ -61,9 +76,8 @@ _COMMENT_FONT_SIZE = 7
 _COMMENT_COLOR = _RED
 
 
-def _draw_checkmark(page: fitz.Page, x: float, y_center: float) -> None:
+def _draw_checkmark(shape: fitz.Shape, x: float, y_center: float) -> None:
     """Draw a green ✓ at the given position."""
-    shape = page.new_shape()
     half = _ICON_SIZE / 2
     # Checkmark strokes: short stroke down-right, then long stroke up-right
     shape.draw_line(
@@ -75,12 +89,10 @@ def _draw_checkmark(page: fitz.Page, x: float, y_center: float) -> None:
         fitz.Point(x + _ICON_SIZE - 2, y_center - half + 2),
     )
     shape.finish(color=_GREEN, width=2.5, closePath=False)
-    shape.commit()
 
 
-def _draw_x_mark(page: fitz.Page, x: float, y_center: float) -> None:
+def _draw_x_mark(shape: fitz.Shape, x: float, y_center: float) -> None:
     """Draw a red ✗ at the given position."""
-    shape = page.new_shape()
     half = _ICON_SIZE / 2
     shape.draw_line(
         fitz.Point(x + 2, y_center - half + 2),
@@ -91,12 +103,11 @@ def _draw_x_mark(page: fitz.Page, x: float, y_center: float) -> None:
         fitz.Point(x + 2, y_center + half - 2),
     )
     shape.finish(color=_RED, width=2.5, closePath=False)
-    shape.commit()
 
 
-def _draw_warning(page: fitz.Page, x: float, y_center: float) -> None:
+def _draw_warning(shape: fitz.Shape, x: float, y_center: float) -> None:
     """Draw a ⚠️ warning symbol at the given position."""
-    page.insert_text(
+    shape.insert_text(
         fitz.Point(x, y_center + _ICON_SIZE / 2 - 1),
         "\u26a0",  # ⚠ WARNING SIGN
         fontsize=_ICON_SIZE,
@@ -106,6 +117,12 @@ def _draw_warning(page: fitz.Page, x: float, y_center: float) -> None:
     )
 
 
+@functools.lru_cache(maxsize=256)
+def _helv_text_length(text: str, fontsize: float) -> float:
+    """Width of *text* in Helvetica; the header and repeated comments hit the cache."""
+    return fitz.get_text_length(text, fontname="helv", fontsize=fontsize)
+
+
 _ICON_DRAWERS = {
     "ok": _draw_checkmark,
     "mismatch": _draw_x_mark,
@@ -119,11 +136,49 @@ _ICON_DRAWERS = {
 # ---------------------------------------------------------------------------
 
 
+# A page's text as (lowercased line text, [(char_offset, x0, y0, y1), ...])
+# entries, one per text line, with one tuple per word on the line.
+_PageLines = list[tuple[str, list[tuple[int, float, float, float]]]]
+
+
+def _page_lines(page: fitz.Page) -> _PageLines:
+    """Extract *page*'s words once and group them into searchable lines."""
+    lines: _PageLines = []
+    current_key = None
+    parts: list[str] = []
+    offsets: list[tuple[int, float, float, float]] = []
+    pos = 0
+    for x0, y0, _x1, y1, word, block_no, line_no, _word_no in page.get_text("words"):
+        if (block_no, line_no) != current_key:
+            if parts:
+                lines.append((" ".join(parts), offsets))
+            current_key = (block_no, line_no)
+            parts, offsets, pos = [], [], 0
+        offsets.append((pos, x0, y0, y1))
+        parts.append(word.lower())
+        pos += len(word) + 1
+    if parts:
+        lines.append((" ".join(parts), offsets))
+    return lines
+
+
+def _iter_line_hits(lines: _PageLines, needle: str):
+    """Yield (x0, y_center) of the word where each occurrence of *needle* starts."""
+    for text, offsets in lines:
+        start = text.find(needle)
+        while start != -1:
+            i = bisect_right(offsets, start, key=itemgetter(0)) - 1
+            _, x0, y0, y1 = offsets[i]
+            yield x0, (y0 + y1) / 2
+            start = text.find(needle, start + 1)
+
+
 def _find_text_position(
     page: fitz.Page,
     search_text: str,
     used_positions: set[tuple[int, int]] | None = None,
     page_idx: int = 0,
+    lines: _PageLines | None = None,
 ) -> tuple[float, float] | None:
     """Search for *search_text* on *page* and return (x0, y_center) of the
     first match whose row hasn't been used yet, or ``None``.
@@ -131,14 +186,34 @@ def _find_text_position(
     *used_positions* tracks ``(page_idx, round(y_center))`` keys already
     consumed so that duplicate descriptions land on different physical
     rows rather than stacking on the first occurrence.
+
+    *lines* is the page's ``_page_lines`` cache; pass it when searching the
+    same page repeatedly.  ``page.search_for`` is only used when the cached
+    lines contain no match at all (e.g. text wrapped across lines).
     """
     if not search_text:
         return None
     if used_positions is None:
         used_positions = set()
+    if lines is None:
+        lines = _page_lines(page)
 
     # Try searching for substrings of decreasing length (in case the full
     # description was truncated or reformatted).
+    needle = " ".join(search_text.split()).lower()
+    if not needle:
+        return None  # whitespace only; "" would match the start of every line
+    any_hit = False
+    for length in (len(needle), 60, 30):
+        for x0, y_center in _iter_line_hits(lines, needle[:length]):
+            any_hit = True
+            row_key = (page_idx, round(y_center))
+            if row_key not in used_positions:
+                used_positions.add(row_key)
+                return x0, y_center
+    if any_hit:
+        return None
+
     for length in (len(search_text), 60, 30):
         hits = page.search_for(search_text[:length])
         for r in hits:
@@ -170,6 +245,7 @@ def _determine_outcome(
 def annotate_pdf(
     pdf_bytes: bytes,
     result: ValidationResult,
+    doc: fitz.Document | None = None,
 ) -> tuple[bytes, str]:
     """
     Create a marked-up copy of a PO PDF.
@@ -181,77 +257,97 @@ def annotate_pdf(
       of the first page.
     - Missing work items listed at the bottom of the last page.
 
+    If *doc* is an already-open document for *pdf_bytes* it is marked up in
+    place and left open for the caller to close.
+
     Returns (annotated_pdf_bytes, output_filename).
     """
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    owns_doc = doc is None
+    if doc is None:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
 
     annotations = result.annotations
 
     # Track text positions already used so duplicate descriptions
     # land on successive occurrences rather than the same spot.
     used_positions: set[tuple[int, int]] = set()
+    log_debug = logger.isEnabledFor(logging.DEBUG)
 
     # ---- Per-line annotations ----
+    # Group by page (keeping order) so each page gets a single Shape: all
+    # strokes, comment backgrounds and text are committed to the content
+    # stream in one go.  A Shape emits its text after its drawings, so the
+    # comments always sit on top of their white backgrounds.
+    annotations_by_page: dict[int, list[LineAnnotation]] = defaultdict(list)
     for ann in annotations:
         page_idx = ann.page_number or 0
         if page_idx >= len(doc):
             page_idx = 0
-        page = doc[page_idx]
+        annotations_by_page[page_idx].append(ann)
 
-        draw_fn = _ICON_DRAWERS.get(ann.status, _draw_warning)
-
-        # Determine position: prefer bbox, fall back to text search
-        if ann.bbox:
-            x = ann.bbox[0] - _ICON_SIZE - _ICON_MARGIN
-            y_center = (ann.bbox[1] + ann.bbox[3]) / 2
-            # Mark this row as used so text-search fallbacks skip it
-            used_positions.add((page_idx, round(y_center)))
-            # Clamp to page
-            if x < 2:
-                x = ann.bbox[2] + _ICON_MARGIN
-        elif ann.search_text:
-            pos = _find_text_position(page, ann.search_text, used_positions, page_idx)
-            if pos:
-                x = pos[0] - _ICON_SIZE - _ICON_MARGIN
-                y_center = pos[1]
+    for page_idx, page_annotations in annotations_by_page.items():
+        page = doc[page_idx]
+        shape = page.new_shape()
+        page_lines: _PageLines | None = None  # word index, built on first search
+
+        for ann in page_annotations:
+            # Determine position: prefer bbox, fall back to text search
+            if ann.bbox:
+                x = ann.bbox[0] - _ICON_SIZE - _ICON_MARGIN
+                y_center = (ann.bbox[1] + ann.bbox[3]) / 2
+                # Mark this row as used so text-search fallbacks skip it
+                used_positions.add((page_idx, round(y_center)))
+                # Clamp to page
                 if x < 2:
-                    x = pos[0] + _ICON_MARGIN
+                    x = ann.bbox[2] + _ICON_MARGIN
+            elif ann.search_text:
+                if page_lines is None:
+                    page_lines = _page_lines(page)
+                pos = _find_text_position(
+                    page, ann.search_text, used_positions, page_idx, lines=page_lines
+                )
+                if pos:
+                    x = pos[0] - _ICON_SIZE - _ICON_MARGIN
+                    y_center = pos[1]
+                    if x < 2:
+                        x = pos[0] + _ICON_MARGIN
+                else:
+                    if log_debug:
+                        logger.debug(
+                            "Could not locate text %r on page %d",
+                            ann.search_text,
+                            page_idx,
+                        )
+                    continue
             else:
-                logger.debug(
-                    "Could not locate text %r on page %d", ann.search_text, page_idx
+                continue  # no position info at all
+
+            _ICON_DRAWERS.get(ann.status, _draw_warning)(shape, x, y_center)
+
+            # Add comment text for mismatches (with white background for legibility)
+            if ann.comment and ann.status in ("mismatch", "missing"):
+                comment_x = x + _ICON_SIZE + _ICON_MARGIN
+                comment_y = y_center + _COMMENT_FONT_SIZE / 2
+                # Measure text width so we can draw a background rectangle
+                text_width = _helv_text_length(ann.comment, _COMMENT_FONT_SIZE)
+                pad = 2  # padding around text
+                bg_rect = fitz.Rect(
+                    comment_x - pad,
+                    comment_y - _COMMENT_FONT_SIZE - pad,
+                    comment_x + text_width + pad,
+                    comment_y + pad,
+                )
+                shape.draw_rect(bg_rect)
+                shape.finish(color=None, fill=(1, 1, 1))  # white fill, no border
+                shape.insert_text(
+                    fitz.Point(comment_x, comment_y),
+                    ann.comment,
+                    fontsize=_COMMENT_FONT_SIZE,
+                    fontname="helv",
+                    color=_COMMENT_COLOR,
                 )
-                continue
-        else:
-            continue  # no position info at all
-
-        draw_fn(page, x, y_center)
-
-        # Add comment text for mismatches (with white background for legibility)
-        if ann.comment and ann.status in ("mismatch", "missing"):
-            comment_x = x + _ICON_SIZE + _ICON_MARGIN
-            comment_y = y_center + _COMMENT_FONT_SIZE / 2
-            # Measure text width so we can draw a background rectangle
-            text_width = fitz.get_text_length(
-                ann.comment, fontname="helv", fontsize=_COMMENT_FONT_SIZE
-            )
-            pad = 2  # padding around text
-            bg_rect = fitz.Rect(
-                comment_x - pad,
-                comment_y - _COMMENT_FONT_SIZE - pad,
-                comment_x + text_width + pad,
-                comment_y + pad,
-            )
-            shape = page.new_shape()
-            shape.draw_rect(bg_rect)
-            shape.finish(color=None, fill=(1, 1, 1))  # white fill, no border
-            shape.commit()
-            page.insert_text(
-                fitz.Point(comment_x, comment_y),
-                ann.comment,
-                fontsize=_COMMENT_FONT_SIZE,
-                fontname="helv",
-                color=_COMMENT_COLOR,
-            )
+
+        shape.commit()
 
     # ---- Missing work items summary at bottom of last page ----
     if result.missing_items:
@@ -297,9 +393,7 @@ def annotate_pdf(
             y += line_spacing
 
         # Draw a white background behind the entire block
-        max_width = max(
-            fitz.get_text_length(t, fontname="helv", fontsize=fs) for t, fs, _ in lines
-        )
+        max_width = max(_helv_text_length(t, fs) for t, fs, _ in lines)
         pad = 4
         bg_rect = fitz.Rect(
             36 - pad,
@@ -310,33 +404,30 @@ def annotate_pdf(
         shape = last_page.new_shape()
         shape.draw_rect(bg_rect)
         shape.finish(color=None, fill=(1, 1, 1))
-        shape.commit()
 
-        # Now draw the text on top
+        # Text goes in the same Shape and is emitted on top of the background
         for text, fs, ty in lines:
-            last_page.insert_text(
+            shape.insert_text(
                 fitz.Point(36 if fs == header_fs else 40, ty),
                 text,
                 fontsize=fs,
                 fontname="helv",
                 color=_RED,
             )
+        shape.commit()
 
     # ---- Stamp on first page ----
     outcome = _determine_outcome(result)
-    stamp_path = _STAMP_FILES.get(outcome)
-    if stamp_path and stamp_path.exists():
+    stamp = _stamp_pixmap(outcome)
+    if stamp is not None:
+        stamp_pm, stamp_width, stamp_height = stamp
         first_page = doc[0]
         page_rect = first_page.rect
 
         # Target stamp size: 150px wide, maintain aspect ratio
-        stamp_doc = fitz.open(str(stamp_path))
-        stamp_page = stamp_doc[0]
-        stamp_rect = stamp_page.rect
-        scale = 150 / stamp_rect.width if stamp_rect.width else 1
-        stamp_w = stamp_rect.width * scale
-        stamp_h = stamp_rect.height * scale
-        stamp_doc.close()
+        scale = 150 / stamp_width if stamp_width else 1
+        stamp_w = stamp_width * scale
+        stamp_h = stamp_height * scale
 
         # Position: top-right corner with margin
         margin = 20
@@ -346,7 +437,7 @@ def annotate_pdf(
 
         first_page.insert_image(
             target_rect,
-            filename=str(stamp_path),
+            pixmap=stamp_pm,
             overlay=True,
         )
 
@@ -357,7 +448,20 @@ def annotate_pdf(
     filename = f"{stem}_{outcome}.pdf"
 
     # ---- Serialize ----
-    out_bytes = doc.tobytes(deflate=True)
-    doc.close()
+    try:
+        # Drop unused objects and pack the rest into compressed object streams
+        out_bytes = doc.tobytes(
+            garbage=4,
+            deflate=True,
+            deflate_images=True,
+            deflate_fonts=True,
+            use_objstms=1,
+            clean=True,
+        )
+    except TypeError:
+        # Older PyMuPDF without object-stream support
+        out_bytes = doc.tobytes(garbage=4, deflate=True)
+    if owns_doc:
+        doc.close()
 
     return out_bytes, filename
@@ -9,17 +9,38 @@ Tier 2 – Google Gemini vision: handles arbitrary layouts, handwritten notes,
 
 from __future__ import annotations
 
-import base64
+import hashlib
 import io
 import json
 import logging
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
 from os import getenv
-from typing import Any
+from typing import Any, Iterable, Iterator, Sequence
 from google.genai import types, Client as GenAIClient
 
 import pdfplumber
 
+try:
+    # Optional RE2 engine: linear-time matching for the patterns that scan
+    # whole-document text.  Falls back to the standard library ``re``.
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    # Optional faster JSON parser for Gemini responses.  Its decode error
+    # subclasses json.JSONDecodeError, so error handling is unchanged.
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+from app.pdfium import pdfium_lock
+
 from .models import POExtraction, POLineItem
 
 logger = logging.getLogger(__name__)
@@ -28,22 +49,43 @@ logger = logging.getLogger(__name__)
 # Configuration
 # ---------------------------------------------------------------------------
 CONFIDENCE_THRESHOLD = 0.7  # below this → fall back to LLM
-
-# Patterns used to locate relevant columns in extracted tables
-_SN_HEADER_PATTERNS = re.compile(r"(?i)\b(serial\s*(?:#|number|no\.?)?|s/?n)\b")
-_PRICE_HEADER_PATTERNS = re.compile(
-    r"(?i)\b(unit\s*price|price|rate|amount"
-    r"|ext(?:ended)?\.?\s*(?:price|amt)?|total|each)\b"
-)
-_QTY_HEADER_PATTERNS = re.compile(r"(?i)\b(qty|quantity|qty\.?)\b")
-_DESC_HEADER_PATTERNS = re.compile(
-    r"(?i)\b(desc(?:ription)?|item|service|part|detail|product)\b"
+RAW_TEXT_LIMIT = 5000  # chars of Tier 1 text kept on the result
+# Render Tier 2 page images while Tier 1 runs, so a fallback to the LLM
+# doesn't wait for rendering.  Off by default: when Tier 1 succeeds, which
+# is the usual case for digital POs, the render is wasted CPU.
+SPECULATIVE_RENDER = False
+
+# Tier 1 results for recently seen PDFs, keyed by content hash
+_TIER1_CACHE_SIZE = 16
+_TIER1_CACHE_MAX_BYTES = 5 * 1024 * 1024
+_tier1_cache: OrderedDict[tuple[int, bytes], POExtraction] = OrderedDict()
+_tier1_cache_lock = threading.Lock()
+
+
+def _compile_scan(pattern: str) -> Any:
+    """Compile a whole-text scan pattern with RE2 when it is installed."""
+    return re2.compile(pattern) if re2 is not None else re.compile(pattern)
+
+
+# Column kinds recognised in table headers, as one alternation: a single
+# finditer over a header reports every kind it mentions.  The description
+# kinds are split by priority (desc/product > service/detail > item).
+_HEADER_CLASSIFIER = re.compile(
+    r"(?i)(?P<sn>\b(?:serial\s*(?:#|number|no\.?)?|s/?n)\b)"
+    r"|(?P<price>\b(?:unit\s*price|price|rate|amount"
+    r"|ext(?:ended)?\.?\s*(?:price|amt)?|total|each)\b)"
+    r"|(?P<qty>\b(?:qty|quantity|qty\.?)\b)"
+    r"|(?P<desc>\b(?:desc(?:ription)?|product)\b)"
+    r"|(?P<service>\b(?:service|detail)\b)"
+    r"|(?P<item>\bitem\b)"
 )
+# "item" headers that are really line numbers ("Line Item", "Item No", ...)
+_ITEM_NEG = re.compile(r"(?i)(line|#|no\.?|number)")
 
 # Pattern to extract serial numbers embedded in description text
 # Matches: SN:J530199, S/N HDCC000017632, (SN: M21400189),
 #          (Yokogawa SN: T16709667728), SN 305939
-_SN_IN_TEXT = re.compile(
+_SN_IN_TEXT = _compile_scan(
     r"(?i)(?:s/?n[:#]?\s*|serial\s*(?:#|no\.?)?:?\s*)" r"([A-Z0-9][A-Z0-9_.\-]{2,30})"
 )
 
@@ -53,19 +95,38 @@ _SN_IN_TEXT = re.compile(
 # ---------------------------------------------------------------------------
 
 
-def _find_column_index(headers: list[str], pattern: re.Pattern) -> int | None:
-    """Return the index of the first header matching *pattern*, or None."""
+def _classify_headers(headers: list[str]) -> dict[str, list[int]]:
+    """Map each column kind to the indices of the headers that mention it."""
+    kinds: dict[str, list[int]] = {}
     for i, h in enumerate(headers):
-        if h and pattern.search(h):
-            return i
+        if not h:
+            continue
+        for m in _HEADER_CLASSIFIER.finditer(h):
+            kind = m.lastgroup or ""  # every alternative is a named group
+            if kind == "item" and _ITEM_NEG.search(h):
+                continue
+            indices = kinds.setdefault(kind, [])
+            if not indices or indices[-1] != i:
+                indices.append(i)
+    return kinds
+
+
+def _first_index(kinds: dict[str, list[int]], *names: str) -> int | None:
+    """Return the first header index for the highest-priority kind present."""
+    for name in names:
+        if name in kinds:
+            return kinds[name][0]
     return None
 
 
+_NON_PRICE_CHARS = re.compile(r"[^\d.\-]")
+
+
 def _clean_price(raw: str | None) -> float | None:
     """Parse a price string like '$1,234.56' into a float."""
     if not raw:
         return None
-    cleaned = re.sub(r"[^\d.\-]", "", str(raw))
+    cleaned = _NON_PRICE_CHARS.sub("", str(raw))
     try:
         return float(cleaned)
     except ValueError:
@@ -73,40 +134,47 @@ def _clean_price(raw: str | None) -> float | None:
 
 
 class _PageTable:
-    """A table extracted from a specific page, with spatial data."""
+    """A table extracted from a specific page, with spatial data.
 
-    __slots__ = ("page_index", "table_bbox", "cells", "data")
+    When built from a pdfplumber table the bboxes are computed on first
+    access, since most tables are rejected on their headers before then.
+    """
+
+    __slots__ = ("page_index", "data", "_table_bbox", "_row_bboxes", "_source")
 
     def __init__(
         self,
         page_index: int,
-        table_bbox: tuple[float, float, float, float],
-        cells: list[tuple[float, float, float, float]],
+        table_bbox: tuple[float, float, float, float] | None,
+        row_bboxes: list[tuple[float, float, float, float]] | None,
         data: list[list[str | None]],
     ):
         self.page_index = page_index
-        self.table_bbox = table_bbox
-        self.cells = cells
         self.data = data
-
-
-def _extract_tables_from_pages(pdf: Any) -> list[_PageTable]:
-    """Extract all tables from all pages, preserving page index and bbox."""
-    all_tables: list[_PageTable] = []
-    for page_idx, page in enumerate(pdf.pages):
-        found = page.find_tables()
-        for tbl in found:
-            data = tbl.extract()
-            if data:
-                all_tables.append(
-                    _PageTable(
-                        page_index=page_idx,
-                        table_bbox=tuple(tbl.bbox),  # type: ignore[arg-type]
-                        cells=list(tbl.cells) if tbl.cells else [],
-                        data=data,
-                    )
-                )
-    return all_tables
+        self._table_bbox = table_bbox
+        self._row_bboxes = row_bboxes
+        self._source: Any = None
+
+    @classmethod
+    def from_pdfplumber(
+        cls, page_index: int, tbl: Any, data: list[list[str | None]]
+    ) -> _PageTable:
+        page_table = cls(page_index, None, None, data)
+        page_table._source = tbl
+        return page_table
+
+    @property
+    def table_bbox(self) -> tuple[float, float, float, float] | None:
+        if self._table_bbox is None and self._source is not None:
+            self._table_bbox = tuple(self._source.bbox)  # type: ignore[assignment]
+        return self._table_bbox
+
+    @property
+    def row_bboxes(self) -> list[tuple[float, float, float, float]]:
+        if self._row_bboxes is None:
+            rows = self._source.rows if self._source is not None else ()
+            self._row_bboxes = [tuple(r.bbox) for r in rows]
+        return self._row_bboxes
 
 
 class _PageText:
@@ -119,6 +187,34 @@ class _PageText:
         self.text = text
 
 
+@dataclass(slots=True)
+class _RawLineItem:
+    """A line item while Tier 1 is still parsing and enriching it.
+
+    Only the items of the winning table (or the text parse) are converted
+    to :class:`POLineItem` at the end of :func:`extract_with_pdfplumber`.
+    """
+
+    serial_number: str | None
+    description: str
+    unit_price: float | None
+    quantity: int | None
+    extended_price: float | None
+    page_number: int | None
+    bbox: tuple[float, float, float, float] | None
+
+    def to_model(self) -> POLineItem:
+        return POLineItem(
+            serial_number=self.serial_number,
+            description=self.description,
+            unit_price=self.unit_price,
+            quantity=self.quantity,
+            extended_price=self.extended_price,
+            page_number=self.page_number,
+            bbox=self.bbox,
+        )
+
+
 def _extract_text_from_pages(pdf: Any) -> tuple[str, list[_PageText]]:
     """Extract full text and per-page text from all pages."""
     pages: list[_PageText] = []
@@ -130,6 +226,23 @@ def _extract_text_from_pages(pdf: Any) -> tuple[str, list[_PageText]]:
     return combined, pages
 
 
+def _iter_tables_from_pages(pdf: Any) -> Iterator[_PageTable]:
+    """Yield the tables of each page in order, preserving page index and bbox.
+
+    Tables are only detected as the caller asks for them, and each page's
+    parsed layout is released once its tables have been read.
+    """
+    for page_idx, page in enumerate(pdf.pages):
+        found = page.find_tables()
+        tables = []
+        for tbl in found:
+            data = tbl.extract()
+            if data:
+                tables.append(_PageTable.from_pdfplumber(page_idx, tbl, data))
+        page.close()
+        yield from tables
+
+
 # Pattern to match IP addresses (false positive for S/N)
 _IP_ADDRESS = re.compile(r"^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$")
 
@@ -146,24 +259,44 @@ def _extract_serial_from_text(text: str) -> str | None:
     return sn
 
 
-def _find_po_number(text: str) -> str:
-    """Try to find the PO number in raw text."""
-    # Try specific formats first (most precise → least)
-    patterns = [
-        # "Purchase Order#20260105016PO" or "Purchase Order No: 53105"
-        r"(?i)purchase\s+order\s*(?:#|no\.?:?)\s*([A-Z0-9][\w\-]{2,30})",
-        # "Purchase Order 10496" — same line only, must start with digit
-        r"(?i)purchase\s+order[ \t]+(\d[\w\-]{2,30})",
-        # "PO Number: 160003"
-        r"(?i)\bPO\s+Number\s*:?\s*([A-Z0-9][\w\-]{2,30})",
-        # "PO No: TE022442" or "PO#: 12345"
-        r"(?i)\bPO\s*(?:#|No\.?)\s*:?\s*([A-Z0-9][\w\-]{2,30})",
-        # "Customer PO: 20260202019PO" or "Customer PO# 53057"
-        r"(?i)customer\s+PO[#:]?\s+([A-Z0-9][\w\-]{2,30})",
-        # "Invoice #: 56561-084498"  (for SSRS docs)
-        r"(?i)invoice\s*#:?\s*(\d[\d\-]{4,30})",
-    ]
-    false_positives = {
+# PO number formats, tried in order (most precise → least)
+_PO_PATTERN_SOURCES = (
+    # "Purchase Order#20260105016PO" or "Purchase Order No: 53105"
+    r"(?i)purchase\s+order\s*(?:#|no\.?:?)\s*([A-Z0-9][\w\-]{2,30})",
+    # "Purchase Order 10496" — same line only, must start with digit
+    r"(?i)purchase\s+order[ \t]+(\d[\w\-]{2,30})",
+    # "PO Number: 160003"
+    r"(?i)\bPO\s+Number\s*:?\s*([A-Z0-9][\w\-]{2,30})",
+    # "PO No: TE022442" or "PO#: 12345"
+    r"(?i)\bPO\s*(?:#|No\.?)\s*:?\s*([A-Z0-9][\w\-]{2,30})",
+    # "Customer PO: 20260202019PO" or "Customer PO# 53057"
+    r"(?i)customer\s+PO[#:]?\s+([A-Z0-9][\w\-]{2,30})",
+    # "Invoice #: 56561-084498"  (for SSRS docs)
+    r"(?i)invoice\s*#:?\s*(\d[\d\-]{4,30})",
+)
+_PO_PATTERNS = tuple(_compile_scan(p) for p in _PO_PATTERN_SOURCES)
+if re2 is not None:
+    # One RE2 pass reports which formats occur anywhere in the text, so only
+    # those patterns are searched again for their capture group.
+    _PO_PATTERN_SET = re2.Set.SearchSet()
+    for _p in _PO_PATTERN_SOURCES:
+        _PO_PATTERN_SET.Add(_p)
+    _PO_PATTERN_SET.Compile()
+else:
+    _PO_PATTERN_SET = None
+# Every format in one alternation.  Its first match is at or before the
+# first match of any single format, so one scan rules out documents with
+# no PO number and tells the per-format searches where to start.  The
+# lookahead on the formats' first letters lets the scan skip other
+# positions quickly; a bare alternation is slower than the six searches.
+_PO_ANY = re.compile(
+    "(?=[pci])(?:"
+    + "|".join(f"(?:{p.removeprefix('(?i)')})" for p in _PO_PATTERN_SOURCES)
+    + ")",
+    re.I,
+)
+_PO_FALSE_POSITIVES = frozenset(
+    {
         "VENDOR",
         "TO",
         "NUMBER",
@@ -176,11 +309,27 @@ def _find_po_number(text: str) -> str:
         "PAGE",
         "CUSTOMER",
     }
-    for pat in patterns:
-        m = re.search(pat, text)
+)
+
+
+def _find_po_number(text: str) -> str:
+    """Try to find the PO number in raw text."""
+    start = 0
+    candidates: Sequence[Any]  # re or re2 patterns, in priority order
+    if _PO_PATTERN_SET is not None:
+        hits = _PO_PATTERN_SET.Match(text) or ()
+        candidates = [_PO_PATTERNS[i] for i in sorted(hits)]
+    else:
+        first = _PO_ANY.search(text)
+        if first is None:
+            return ""
+        start = first.start()
+        candidates = _PO_PATTERNS
+    for pat in candidates:
+        m = pat.search(text, start)
         if m:
             val = m.group(1).strip()
-            if val.upper() in false_positives:
+            if val.upper() in _PO_FALSE_POSITIVES:
                 continue
             return val
     return ""
@@ -188,12 +337,6 @@ def _find_po_number(text: str) -> str:
 
 def _find_header_row(table: list[list[str | None]]) -> int:
     """Find the row that best matches a header row (most recognised columns)."""
-    all_patterns = [
-        _SN_HEADER_PATTERNS,
-        _PRICE_HEADER_PATTERNS,
-        _QTY_HEADER_PATTERNS,
-        re.compile(r"(?i)\b(desc(?:ription)?|product|service|detail)\b"),
-    ]
     best_row = 0
     best_score = 0
     for ri, row in enumerate(table[: min(len(table), 8)]):
@@ -202,10 +345,9 @@ def _find_header_row(table: list[list[str | None]]) -> int:
             if not cell:
                 continue
             s = str(cell).strip()
-            for p in all_patterns:
-                if p.search(s):
-                    score += 1
-                    break
+            # Any recognised column except a bare "item" counts
+            if any(m.lastgroup != "item" for m in _HEADER_CLASSIFIER.finditer(s)):
+                score += 1
         if score > best_score:
             best_score = score
             best_row = ri
@@ -217,43 +359,35 @@ def _find_desc_column_index(headers: list[str]) -> int | None:
 
     Avoids matching 'Line\\nItem', 'Item No', 'Supplier Part No', etc.
     """
-    # Priority 1: explicit "description" or "product"
-    for i, h in enumerate(headers):
-        if h and re.search(r"(?i)\b(desc(?:ription)?|product)\b", h):
-            return i
-    # Priority 2: "service", "detail"
-    for i, h in enumerate(headers):
-        if h and re.search(r"(?i)\b(service|detail)\b", h):
-            return i
-    # Priority 3: "item" but NOT "line item" / "item no" / "item #"
-    for i, h in enumerate(headers):
-        if not h:
-            continue
-        norm = re.sub(r"\s+", " ", h)
-        if re.search(r"(?i)\bitem\b", norm) and not re.search(
-            r"(?i)(line|#|no\.?|number)", norm
-        ):
-            return i
-    return None
+    return _first_index(_classify_headers(headers), "desc", "service", "item")
 
 
 # Rows matching this pattern are subtotal / tax / routing lines
 _SKIP_ROW_PAT = re.compile(
     r"(?i)(sub\s*total|grand\s*total|\btotal\b" r"|full\s*tax|withheld|route\s*to)"
 )
+_CELL_NEWLINE = re.compile(r"\s*\n\s*")
+_NON_DIGITS = re.compile(r"[^\d]")
+
+
+def _row_cell(row: list[str | None], idx: int | None) -> str | None:
+    """Safely index into a table row (tables can be ragged)."""
+    if idx is None or idx >= len(row):
+        return None
+    cell = row[idx]
+    return str(cell).strip() if cell else None
 
 
 def _parse_table(
     page_table: _PageTable,
-) -> tuple[list[POLineItem], float]:
+) -> tuple[list[_RawLineItem], float]:
     """
-    Attempt to parse a single table into POLineItems.
+    Attempt to parse a single table into line items.
 
     Returns (items, confidence).  Confidence is based on how many expected
     columns were found and how many rows yielded usable data.
     """
     table = page_table.data
-    cells = page_table.cells
 
     if not table or len(table) < 2:
         return [], 0.0
@@ -265,106 +399,66 @@ def _parse_table(
 
     raw_headers = [str(cell).strip() if cell else "" for cell in table[hdr_idx]]
 
-    sn_idx = _find_column_index(raw_headers, _SN_HEADER_PATTERNS)
-    price_idx = _find_column_index(raw_headers, _PRICE_HEADER_PATTERNS)
-    qty_idx = _find_column_index(raw_headers, _QTY_HEADER_PATTERNS)
-    desc_idx = _find_desc_column_index(raw_headers)
+    kinds = _classify_headers(raw_headers)
+    sn_idx = _first_index(kinds, "sn")
+    price_idx = _first_index(kinds, "price")
+    qty_idx = _first_index(kinds, "qty")
+    desc_idx = _first_index(kinds, "desc", "service", "item")
+    # With several price-like columns, the last holds the extended price
+    # (price_idx is the first)
+    price_indices = kinds.get("price", [])
+    ext_price_idx = price_indices[-1] if len(price_indices) > 1 else None
 
     # We need at least a price OR serial-number column to be useful
     if price_idx is None and sn_idx is None:
         return [], 0.0
 
-    # Build a mapping from row_index → row bbox.
-    # pdfplumber cells are NOT guaranteed row-major; they may be
-    # column-major (sorted by x then y).  We group cells by their
-    # y-coordinate (top edge) using a tolerance to handle rounding.
-    row_bboxes: dict[int, tuple[float, float, float, float]] = {}
-    if cells:
-        # 1) Collect unique y-top values with tolerance grouping
-        y_tops: list[float] = sorted({round(c[1], 1) for c in cells})
-        # Merge y values within 2pt of each other into a single row
-        merged_y: list[float] = []
-        for y in y_tops:
-            if merged_y and abs(y - merged_y[-1]) < 2:
-                continue
-            merged_y.append(y)
-
-        # 2) Map each cell to its row index based on y-position
-        def _y_to_row(y: float) -> int:
-            for ri, ry in enumerate(merged_y):
-                if abs(y - ry) < 2:
-                    return ri
-            return len(merged_y)  # fallback
-
-        for cell_bbox in cells:
-            row_i = _y_to_row(round(cell_bbox[1], 1))
-            if row_i not in row_bboxes:
-                row_bboxes[row_i] = cell_bbox
-            else:
-                prev = row_bboxes[row_i]
-                row_bboxes[row_i] = (
-                    min(prev[0], cell_bbox[0]),
-                    min(prev[1], cell_bbox[1]),
-                    max(prev[2], cell_bbox[2]),
-                    max(prev[3], cell_bbox[3]),
-                )
-
-    items: list[POLineItem] = []
+    row_bboxes = page_table.row_bboxes
+    items: list[_RawLineItem] = []
     for data_row_idx, row in enumerate(table[hdr_idx + 1 :]):
-        if not row or all(not cell for cell in row):
+        if not row or not any(row):
             continue
 
         # Skip subtotal / tax / routing rows
-        row_text = " ".join(str(c) for c in row if c)
+        row_text = " ".join(map(str, filter(None, row)))
         if _SKIP_ROW_PAT.search(row_text):
             continue
 
-        # Safely index into row (tables can be ragged)
-        def _cell(idx: int | None) -> str | None:
-            if idx is None or idx >= len(row):
-                return None
-            return str(row[idx]).strip() if row[idx] else None
-
-        sn = _cell(sn_idx)
-        description = _cell(desc_idx) or ""
+        sn = _row_cell(row, sn_idx)
+        description = _row_cell(row, desc_idx) or ""
         # Clean multiline cell content
-        description = re.sub(r"\s*\n\s*", " ", description).strip()
+        description = _CELL_NEWLINE.sub(" ", description).strip()
 
         # Try extracting S/N from description if no dedicated column
         if not sn and description:
             sn = _extract_serial_from_text(description)
 
-        unit_price = _clean_price(_cell(price_idx))
-        qty_raw = _cell(qty_idx)
+        unit_price = _clean_price(_row_cell(row, price_idx))
+        qty_raw = _row_cell(row, qty_idx)
         quantity: int | None = None
         if qty_raw:
             try:
-                quantity = int(re.sub(r"[^\d]", "", qty_raw))
+                quantity = int(_NON_DIGITS.sub("", qty_raw))
             except ValueError:
                 pass
 
         # Look for a second price column (extended / total)
         extended_price: float | None = None
-        if price_idx is not None:
-            price_indices = [
-                i
-                for i, h in enumerate(raw_headers)
-                if _PRICE_HEADER_PATTERNS.search(h)
-                if h
-            ]
-            if len(price_indices) > 1 and price_indices[-1] != price_idx:
-                extended_price = _clean_price(_cell(price_indices[-1]))
+        if ext_price_idx is not None:
+            extended_price = _clean_price(_row_cell(row, ext_price_idx))
 
         # Skip rows that have no meaningful content
         if sn is None and unit_price is None and not description:
             continue
 
-        # Compute row bbox from cell coordinates
+        # pdfplumber's rows line up one-to-one with the extracted data rows
         abs_row_idx = hdr_idx + 1 + data_row_idx
-        item_bbox = row_bboxes.get(abs_row_idx)
+        item_bbox = (
+            row_bboxes[abs_row_idx] if abs_row_idx < len(row_bboxes) else None
+        )
 
         items.append(
-            POLineItem(
+            _RawLineItem(
                 serial_number=sn,
                 description=description,
                 unit_price=unit_price,
@@ -396,46 +490,51 @@ def _parse_table(
 # ---------------------------------------------------------------------------
 
 
-def _enrich_items_with_text_sns(items: list[POLineItem], raw_text: str) -> None:
+def _enrich_items_with_text_sns(items: list[_RawLineItem], raw_text: str) -> None:
     """
     Scan raw_text for serial numbers near item descriptions and
     attach them to items that are missing S/Ns.  Modifies in place.
     """
-    all_sns = _SN_IN_TEXT.findall(raw_text)
-    if not all_sns:
-        return
-    # Filter out IP addresses and S/Ns already assigned to other items
+    # Filter out IP addresses and S/Ns already assigned to other items.
+    # Matches are pulled lazily, so scanning stops once every item has one.
+    # (The IP check stays in Python: RE2 has no lookahead.)
     assigned = {it.serial_number for it in items if it.serial_number}
-    valid = [
-        sn.strip()
-        for sn in all_sns
-        if not _IP_ADDRESS.match(sn.strip()) and sn.strip() not in assigned
-    ]
-    sn_iter = iter(valid)
+    sn_iter = (
+        sn
+        for sn in (m.group(1).strip() for m in _SN_IN_TEXT.finditer(raw_text))
+        if not _IP_ADDRESS.match(sn) and sn not in assigned
+    )
     for item in items:
         if item.serial_number:
             continue
         sn = next(sn_iter, None)
-        if sn:
-            item.serial_number = sn
+        if sn is None:
+            return
+        item.serial_number = sn
 
 
-_SKIP_LINE_PAT = re.compile(
-    r"(?i)(sub\s*tota[il]|grand\s*total|order\s*total"
+_SKIP_LINE_WORDS = (
+    r"sub\s*tota[il]|grand\s*total|order\s*total"
     r"|\btotal\s*:|^total$|^tax\b|^shipping\b|^freight\b"
-    r"|comments|approved\s+by)"
+    r"|comments|approved\s+by"
 )
+_SKIP_LINE_PAT = re.compile(rf"(?i)({_SKIP_LINE_WORDS})")
+_PRICE_IN_TEXT = re.compile(r"\$(\d[\d,.]+)")
+_MULTI_SPACE = re.compile(r"\s{2,}")
+# A continuation line ends the description if it has a price or is a
+# skip line; one alternation checks both in a single scan.
+_DESC_STOP = re.compile(rf"(?i)\$\d[\d,.]+|{_SKIP_LINE_WORDS}")
 
 
-def _parse_text_lines(page_texts: list[_PageText]) -> list[POLineItem]:
+def _parse_text_lines(page_texts: list[_PageText]) -> list[_RawLineItem]:
     """
     Regex-based fallback: parse line items from raw text when
     pdfplumber's table extractor finds nothing.
 
     Accepts per-page text so we can record which page each item is on.
     """
-    items: list[POLineItem] = []
-    price_pat = re.compile(r"\$(\d[\d,.]+)")
+    items: list[_RawLineItem] = []
+    price_pat = _PRICE_IN_TEXT
 
     for pt in page_texts:
         lines = pt.text.split("\n")
@@ -471,18 +570,15 @@ def _parse_text_lines(page_texts: list[_PageText]) -> list[POLineItem]:
 
             # Build description from current line (strip prices)
             desc = price_pat.sub("", line).strip()
-            desc = re.sub(r"\s{2,}", " ", desc)[:120]
+            desc = _MULTI_SPACE.sub(" ", desc)[:120]
 
             # Grab description from next 2 non-price, non-boilerplate lines
             for j in range(i + 1, min(len(lines), i + 3)):
                 nl = lines[j].strip()
                 if not nl:
                     continue
-                if price_pat.search(nl):
-                    break
-                if len(nl) > 80:  # likely boilerplate paragraph
-                    break
-                if _SKIP_LINE_PAT.search(nl):
+                # Price line, boilerplate paragraph, or subtotal/tax line
+                if len(nl) > 80 or _DESC_STOP.search(nl):
                     break
                 desc = (desc + " | " + nl)[:250]
 
@@ -493,7 +589,7 @@ def _parse_text_lines(page_texts: list[_PageText]) -> list[POLineItem]:
                 continue
 
             items.append(
-                POLineItem(
+                _RawLineItem(
                     serial_number=sn,
                     description=desc,
                     unit_price=unit_price,
@@ -508,32 +604,93 @@ def _parse_text_lines(page_texts: list[_PageText]) -> list[POLineItem]:
     return items
 
 
-def extract_with_pdfplumber(pdf_bytes: bytes) -> POExtraction | None:
+def _best_table(tables: Iterable[_PageTable]) -> tuple[list[_RawLineItem], float]:
+    """Parse each table in turn and keep the items of the most confident one.
+
+    Stops detecting further tables once one scores the maximum confidence
+    of 1.0, since no later table could replace it.
+    """
+    best_items: list[_RawLineItem] = []
+    best_conf = 0.0
+    for tbl in tables:
+        items, conf = _parse_table(tbl)
+        if conf > best_conf:
+            best_items, best_conf = items, conf
+            if best_conf >= 1.0:
+                break
+    return best_items, best_conf
+
+
+def open_pdf(pdf_bytes: bytes) -> Any | None:
+    """
+    Open a PDF with pdfplumber so both tiers can share one parsed document.
+
+    Returns None (after logging) if the PDF cannot be opened.  The caller
+    owns the handle and must close it.
+    """
+    try:
+        return pdfplumber.open(io.BytesIO(pdf_bytes))
+    except Exception:
+        logger.exception("pdfplumber failed to open PDF")
+        return None
+
+
+def _pdf_context(pdf_bytes: bytes, pdf: Any = None) -> Any:
+    """Borrow an already-open ``pdf`` or open ``pdf_bytes`` for one block."""
+    if pdf is not None:
+        return nullcontext(pdf)
+    return pdfplumber.open(io.BytesIO(pdf_bytes))
+
+
+def _tier1_cache_key(pdf_bytes: bytes) -> tuple[int, bytes] | None:
+    """Return a content key for *pdf_bytes*, or None if too large to cache."""
+    if len(pdf_bytes) > _TIER1_CACHE_MAX_BYTES:
+        return None
+    return len(pdf_bytes), hashlib.blake2b(pdf_bytes, digest_size=16).digest()
+
+
+def extract_with_pdfplumber(pdf_bytes: bytes, pdf: Any = None) -> POExtraction | None:
     """
     Tier 1: extract PO data using pdfplumber's table detection.
 
     Returns a POExtraction with method='table', or None if nothing useful found.
+    An already-open ``pdf`` (see :func:`open_pdf`) is used and left open.
+    Results are cached by content, so re-validating identical bytes skips
+    the parse; each caller gets its own copy.
     """
+    key = _tier1_cache_key(pdf_bytes)
+    if key is not None:
+        with _tier1_cache_lock:
+            if key in _tier1_cache:
+                _tier1_cache.move_to_end(key)
+                return _tier1_cache[key].model_copy(deep=True)
+
+    result = _extract_with_pdfplumber(pdf_bytes, pdf)
+
+    if key is not None and result is not None:
+        with _tier1_cache_lock:
+            _tier1_cache[key] = result.model_copy(deep=True)
+            _tier1_cache.move_to_end(key)
+            while len(_tier1_cache) > _TIER1_CACHE_SIZE:
+                _tier1_cache.popitem(last=False)
+    return result
+
+
+def _extract_with_pdfplumber(pdf_bytes: bytes, pdf: Any) -> POExtraction | None:
+    """Uncached body of :func:`extract_with_pdfplumber`."""
     try:
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            raw_text, page_texts = _extract_text_from_pages(pdf)
-            tables = _extract_tables_from_pages(pdf)
+        with _pdf_context(pdf_bytes, pdf) as opened:
+            raw_text, page_texts = _extract_text_from_pages(opened)
+            best_items, best_conf = _best_table(_iter_tables_from_pages(opened))
     except Exception:
         logger.exception("pdfplumber failed to open PDF")
         return None
 
-    if not raw_text and not tables:
+    if not raw_text and not best_items:
         return None
 
     po_number = _find_po_number(raw_text)
-
-    # Try each table; keep the best result
-    best_items: list[POLineItem] = []
-    best_conf = 0.0
-    for tbl in tables:
-        items, conf = _parse_table(tbl)
-        if conf > best_conf:
-            best_items, best_conf = items, conf
+    raw_text_prefix = raw_text[:RAW_TEXT_LIMIT]
 
     # If table parsing worked well, also enrich items with S/N from
     # nearby raw text (serial numbers often appear on lines below the
@@ -542,10 +699,10 @@ def extract_with_pdfplumber(pdf_bytes: bytes) -> POExtraction | None:
         _enrich_items_with_text_sns(best_items, raw_text)
         return POExtraction(
             po_number=po_number,
-            line_items=best_items,
+            line_items=[item.to_model() for item in best_items],
             confidence=best_conf,
             extraction_method="table",
-            raw_text=raw_text[:5000],
+            raw_text=raw_text_prefix,
         )
 
     # No structured table found → try regex-based text parsing
@@ -554,10 +711,10 @@ def extract_with_pdfplumber(pdf_bytes: bytes) -> POExtraction | None:
         conf = 0.5  # moderate confidence for regex parsing
         return POExtraction(
             po_number=po_number,
-            line_items=text_items,
+            line_items=[item.to_model() for item in text_items],
             confidence=conf,
             extraction_method="text",
-            raw_text=raw_text[:5000],
+            raw_text=raw_text_prefix,
         )
 
     # Return low-confidence result with raw text for LLM fallback
@@ -566,7 +723,7 @@ def extract_with_pdfplumber(pdf_bytes: bytes) -> POExtraction | None:
         line_items=[],
         confidence=0.1,
         extraction_method="none",
-        raw_text=raw_text[:5000],
+        raw_text=raw_text_prefix,
     )
 
 
@@ -605,24 +762,91 @@ Rules:
 """
 
 
-def _pdf_pages_to_base64_images(pdf_bytes: bytes) -> list[str]:
-    """Convert each PDF page to a base64-encoded PNG using pdfplumber."""
-    images: list[str] = []
+def _strip_code_fence(raw: str) -> str:
+    """Remove the markdown code fence the model sometimes wraps its JSON in."""
+    text = raw.strip()
+    if text.startswith("```"):
+        text = text[3:].removeprefix("json").lstrip()
+    if text.endswith("```"):
+        text = text[:-3].rstrip()
+    return text
+
+
+# Page images sent to Gemini.  Tier 2 mostly sees scans, where JPEG is far
+# smaller than PNG and much cheaper to encode.
+_PAGE_IMAGE_RESOLUTION = 200
+_PAGE_IMAGE_MIME = "image/jpeg"
+_PAGE_IMAGE_QUALITY = 85
+_ENCODE_WORKERS = 4
+
+
+def _encode_page_image(img: Any) -> bytes:
+    """JPEG-encode a rendered page (PIL image)."""
+    if img.mode != "RGB":
+        # JPEG has no alpha or palette; pdfplumber renders RGB, but be safe.
+        img = img.convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=_PAGE_IMAGE_QUALITY)
+    return buf.getvalue()
+
+
+def _render_page(page: Any) -> Any:
+    """Rasterise one pdfplumber page under the app-wide pdfium lock."""
+    with pdfium_lock:
+        return page.to_image(resolution=_PAGE_IMAGE_RESOLUTION).original
+
+
+def _pdf_pages_to_image_bytes(pdf: Any) -> list[bytes]:
+    """Convert each page of an open pdfplumber PDF to JPEG bytes.
+
+    Pages are rasterised one at a time under the shared pdfium lock (pdfium
+    is not thread-safe and every render rewinds the shared stream) while
+    earlier pages are encoded on a small thread pool; Pillow releases the
+    GIL while encoding.
+    """
+    workers = max(1, min(_ENCODE_WORKERS, len(pdf.pages)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_encode_page_image, _render_page(page))
+            for page in pdf.pages
+        ]
+    return [f.result() for f in futures]
+
+
+def _render_page_images(pdf_bytes: bytes) -> list[bytes]:
+    """Render page images from a private handle (safe on another thread)."""
     with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            img = page.to_image(resolution=200)
-            buf = io.BytesIO()
-            img.save(buf, format="PNG")
-            b64 = base64.b64encode(buf.getvalue()).decode()
-            images.append(b64)
-    return images
+        return _pdf_pages_to_image_bytes(pdf)
+
+
+def start_speculative_render(pdf_bytes: bytes) -> Future | None:
+    """
+    Start rendering Tier 2 page images in the background.
 
+    Returns None unless ``SPECULATIVE_RENDER`` is on and Gemini is
+    configured.  Pass the future to :func:`extract_po_data`, which cancels
+    it if Tier 1 succeeds.  The background thread opens its own handle and
+    renders each page under the shared pdfium lock, so it never touches
+    pdfium at the same time as Tier 1 or another job's render.
+    """
+    if not SPECULATIVE_RENDER or not getenv("GEMINI_API_KEY"):
+        return None
+    pool = ThreadPoolExecutor(max_workers=1)
+    rendered = pool.submit(_render_page_images, pdf_bytes)
+    pool.shutdown(wait=False)
+    return rendered
 
-def extract_with_llm(pdf_bytes: bytes) -> POExtraction | None:
+
+def extract_with_llm(
+    pdf_bytes: bytes, pdf: Any = None, rendered: Future | None = None
+) -> POExtraction | None:
     """
     Tier 2: send page images to Google Gemini and ask it to extract line items.
 
     Requires GEMINI_API_KEY env var.  Returns None if the API is unavailable.
+    An already-open ``pdf`` is used for rendering and left open; page images
+    already being rendered (see :func:`start_speculative_render`) are used
+    instead when given.
     """
     api_key = getenv("GEMINI_API_KEY")
     if not api_key:
@@ -632,7 +856,11 @@ def extract_with_llm(pdf_bytes: bytes) -> POExtraction | None:
     client = GenAIClient(api_key=api_key)
 
     try:
-        page_images = _pdf_pages_to_base64_images(pdf_bytes)
+        if rendered is not None:
+            page_images = rendered.result()
+        else:
+            with _pdf_context(pdf_bytes, pdf) as opened:
+                page_images = _pdf_pages_to_image_bytes(opened)
     except Exception:
         logger.exception("Failed to render PDF pages to images")
         return None
@@ -640,9 +868,10 @@ def extract_with_llm(pdf_bytes: bytes) -> POExtraction | None:
     # Build the content parts: system prompt + images
     prompt = _LLM_SYSTEM_PROMPT + "\n\nExtract line items from this PO:"
     parts: list = [types.Part.from_text(text=prompt)]
-    for b64 in page_images:
-        image_bytes = base64.b64decode(b64)
-        parts.append(types.Part.from_bytes(data=image_bytes, mime_type="image/png"))
+    for image_bytes in page_images:
+        parts.append(
+            types.Part.from_bytes(data=image_bytes, mime_type=_PAGE_IMAGE_MIME)
+        )
 
     try:
         response = client.models.generate_content(
@@ -661,8 +890,7 @@ def extract_with_llm(pdf_bytes: bytes) -> POExtraction | None:
     # Parse the JSON response
     try:
         # Strip markdown code fences if present
-        cleaned = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw.strip())
-        data = json.loads(cleaned)
+        data = _json_loads(_strip_code_fence(raw))
     except json.JSONDecodeError:
         logger.error("LLM returned invalid JSON: %s", raw[:500])
         return None
@@ -694,7 +922,15 @@ def extract_with_llm(pdf_bytes: bytes) -> POExtraction | None:
 # ---------------------------------------------------------------------------
 
 
-def extract_po_data(pdf_bytes: bytes) -> POExtraction:
+_TIER1_NOT_RUN = object()  # sentinel: None is a valid Tier 1 result
+
+
+def extract_po_data(
+    pdf_bytes: bytes,
+    table_result: Any = _TIER1_NOT_RUN,
+    pdf: Any = None,
+    rendered: Future | None = None,
+) -> POExtraction:
     """
     Extract structured PO data from a PDF.
 
@@ -702,10 +938,34 @@ def extract_po_data(pdf_bytes: bytes) -> POExtraction:
       1. Try pdfplumber table extraction (fast, free).
       2. If confidence < threshold, try Google Gemini vision.
       3. Return whichever result is better, or a failed result.
+
+    Callers that already ran Tier 1 (e.g. in the background) can pass its
+    result as ``table_result`` to avoid parsing the PDF twice, and the
+    pdfplumber handle it used as ``pdf`` so Tier 2 renders from it.  A
+    handle opened here is closed before returning.  ``rendered`` is a
+    speculative Tier 2 render started alongside Tier 1; one is started here
+    if Tier 1 has not run yet (see ``SPECULATIVE_RENDER``).
     """
+    if pdf is not None or table_result is not _TIER1_NOT_RUN:
+        return _extract_po_data(pdf_bytes, table_result, pdf, rendered)
+    if rendered is None:
+        rendered = start_speculative_render(pdf_bytes)
+    pdf = open_pdf(pdf_bytes)
+    if pdf is None:
+        return _extract_po_data(pdf_bytes, None, None, rendered)
+    with pdf:
+        return _extract_po_data(pdf_bytes, _TIER1_NOT_RUN, pdf, rendered)
+
+
+def _extract_po_data(
+    pdf_bytes: bytes, table_result: Any, pdf: Any, rendered: Future | None
+) -> POExtraction:
     # Tier 1
-    table_result = extract_with_pdfplumber(pdf_bytes)
+    if table_result is _TIER1_NOT_RUN:
+        table_result = extract_with_pdfplumber(pdf_bytes, pdf=pdf)
     if table_result and table_result.confidence >= CONFIDENCE_THRESHOLD:
+        if rendered is not None:
+            rendered.cancel()
         logger.info(
             "Tier 1 (pdfplumber) succeeded — confidence %.2f, %d items",
             table_result.confidence,
@@ -721,7 +981,7 @@ def extract_po_data(pdf_bytes: bytes) -> POExtraction:
     logger.info("%s — trying Tier 2 (LLM)", tier1_note)
 
     # Tier 2
-    llm_result = extract_with_llm(pdf_bytes)
+    llm_result = extract_with_llm(pdf_bytes, pdf=pdf, rendered=rendered)
     if llm_result and llm_result.line_items:
         # Carry raw_text from Tier 1 so validate() can do
         # text-based fallback matching even on LLM results.
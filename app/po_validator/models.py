@@ -36,20 +36,6 @@ class WorkItemData:
         )
 
 
-@dataclass(order=True)
-class PriceMatchCandidate:
-    """A candidate price match between a work item and a PO line item.
-
-    Sortable by price_diff (smallest difference first).
-    """
-
-    price_diff: float
-    wi_idx: int
-    po_idx: int
-    expected_price: float
-    po_price: float
-
-
 class POLineItem(BaseModel):
     """A single line item extracted from a purchase order PDF."""
 
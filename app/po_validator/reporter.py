@@ -11,12 +11,41 @@ from __future__ import annotations
 import csv
 import json
 import logging
+import sys
+from collections import Counter
 from pathlib import Path
+from typing import Iterator
 
 from .models import ValidationResult
 
 logger = logging.getLogger(__name__)
 
+# When False, print_result skips passing POs (set by ``watcher.py --quiet``).
+VERBOSE = True
+
+_STATUS_ICONS = {
+    "pass": "PASS",
+    "fail": "FAIL",
+    "no_pricing": "NO_PRICING",
+    "extraction_failed": "EXTRACTION_FAILED",
+}
+
+_CSV_FIELDNAMES = [
+    "timestamp",
+    "document_name",
+    "po_number",
+    "service_order_id",
+    "status",
+    "extraction_method",
+    "confidence",
+    "work_items_total",
+    "line_items_checked",
+    "line_items_matched",
+    "mismatches",
+    "missing_items",
+    "notes",
+]
+
 
 # ------------------------------------------------------------------
 # Phase 1 — Console output
@@ -25,66 +54,64 @@ logger = logging.getLogger(__name__)
 
 def print_result(result: ValidationResult) -> None:
     """Pretty-print a single validation result to the console."""
-    icon = {
-        "pass": "PASS",
-        "fail": "FAIL",
-        "no_pricing": "NO_PRICING",
-        "extraction_failed": "EXTRACTION_FAILED",
-    }.get(result.status, "???")
-
-    header = (
+    if not VERBOSE and result.status == "pass":
+        return
+    icon = _STATUS_ICONS.get(result.status, "???")
+
+    parts = [
         f"[{icon}] {result.document_name}"
         f"  PO# {result.po_number or '(unknown)'}"
         f"  ({result.extraction_method}, "
-        f"conf={result.confidence:.0%})"
-    )
-    print(header)
-
-    if result.mismatches:
-        for m in result.mismatches:
-            print(
-                f"  MISMATCH  S/N {m.serial_number}: "
-                f"PO ${m.po_price:,.2f} vs "
-                f"Qualer ${m.expected_price:,.2f} "
-                f"(diff ${m.difference:+,.2f})"
-            )
-    if result.missing_items:
-        for mi in result.missing_items:
-            price_str = (
-                f"${mi.expected_price:,.2f}" if mi.expected_price is not None else "n/a"
-            )
-            print(
-                f"  MISSING   S/N {mi.serial_number}: "
-                f"{mi.asset_name} "
-                f"(Qualer price {price_str})"
-            )
+        f"conf={result.confidence:.0%})\n"
+    ]
+
+    for m in result.mismatches:
+        parts.append(
+            f"  MISMATCH  S/N {m.serial_number}: "
+            f"PO ${m.po_price:,.2f} vs "
+            f"Qualer ${m.expected_price:,.2f} "
+            f"(diff ${m.difference:+,.2f})\n"
+        )
+    for mi in result.missing_items:
+        price_str = (
+            f"${mi.expected_price:,.2f}" if mi.expected_price is not None else "n/a"
+        )
+        parts.append(
+            f"  MISSING   S/N {mi.serial_number}: "
+            f"{mi.asset_name} "
+            f"(Qualer price {price_str})\n"
+        )
     if result.status == "pass":
         extra = result.po_line_items_total - result.line_items_matched
         extra_note = f"  ({extra} unmatched PO line(s), e.g. travel)" if extra else ""
-        print(
+        parts.append(
             f"  All {result.line_items_matched} Qualer work item(s) "
-            f"verified on PO{extra_note}"
+            f"verified on PO{extra_note}\n"
         )
     if result.notes:
-        print(f"  Note: {result.notes}")
+        parts.append(f"  Note: {result.notes}\n")
 
-    print()
+    parts.append("\n")
+    # One write per result instead of a print() (and stdout lock) per line.
+    sys.stdout.write("".join(parts))
 
 
 def print_summary(results: list[ValidationResult]) -> None:
     """Print a summary line after all POs are processed."""
+    counts = Counter(r.status for r in results)
     total = len(results)
-    passed = sum(1 for r in results if r.status == "pass")
-    failed = sum(1 for r in results if r.status == "fail")
-    no_price = sum(1 for r in results if r.status == "no_pricing")
-    errors = sum(1 for r in results if r.status == "extraction_failed")
-    print("=" * 60)
-    print(
+    passed = counts["pass"]
+    failed = counts["fail"]
+    no_price = counts["no_pricing"]
+    errors = counts["extraction_failed"]
+    rule = "=" * 60
+    sys.stdout.write(
+        f"{rule}\n"
         f"SUMMARY: {total} POs checked — "
         f"{passed} passed, {failed} FAILED, "
-        f"{no_price} no pricing, {errors} extraction errors"
+        f"{no_price} no pricing, {errors} extraction errors\n"
+        f"{rule}\n"
     )
-    print("=" * 60)
 
 
 # ------------------------------------------------------------------
@@ -92,22 +119,76 @@ def print_summary(results: list[ValidationResult]) -> None:
 # ------------------------------------------------------------------
 
 
+def _migrate_legacy_json_report(p: Path) -> None:
+    """Rewrite a legacy JSON-array report at *p* as JSON Lines."""
+    try:
+        with open(p, "rb") as f:
+            if f.read(1) != b"[":
+                return
+    except FileNotFoundError:
+        return
+    rows = json.loads(p.read_text(encoding="utf-8"))
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_text(
+        "".join(json.dumps(row, default=str) + "\n" for row in rows),
+        encoding="utf-8",
+    )
+    tmp.replace(p)
+    logger.info("Converted legacy JSON report %s to JSON Lines", p)
+
+
 def save_json_report(
     results: list[ValidationResult],
-    path: str | Path = "validation_report.json",
+    path: str | Path = "validation_report.jsonl",
 ) -> None:
-    """Append results to a JSON report file."""
+    """
+    Append results to a JSON Lines report file (one result per line).
+
+    Reports used to be a single JSON array that was rewritten on every
+    save.  An existing file in that format (first byte ``[``) is converted
+    to JSON Lines in place before appending; if it cannot be parsed the
+    error is raised rather than appending lines that would corrupt it.
+    """
     p = Path(path)
-    existing: list = []
-    if p.exists():
-        try:
-            existing = json.loads(p.read_text())
-        except Exception:
-            pass
+    _migrate_legacy_json_report(p)
+    buf = "".join(r.model_dump_json() + "\n" for r in results)
+    with open(p, "a", encoding="utf-8") as f:
+        f.write(buf)
+    logger.info("Appended %d results to %s", len(results), p)
+
 
-    existing.extend(r.model_dump(mode="json") for r in results)
-    p.write_text(json.dumps(existing, indent=2, default=str))
-    logger.info("Saved %d results to %s", len(results), p)
+def load_json_report(
+    path: str | Path = "validation_report.jsonl",
+) -> Iterator[dict]:
+    """Yield each result in a JSON Lines report file as a parsed dict."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _csv_row(r: ValidationResult) -> tuple:
+    """Build one CSV row for *r*, in ``_CSV_FIELDNAMES`` order."""
+    return (
+        r.timestamp.isoformat(),
+        r.document_name,
+        r.po_number,
+        r.service_order_id,
+        r.status,
+        r.extraction_method,
+        f"{r.confidence:.2f}",
+        r.work_items_total,
+        r.line_items_checked,
+        r.line_items_matched,
+        "; ".join(
+            [
+                f"{m.serial_number}: ${m.po_price} vs ${m.expected_price}"
+                for m in r.mismatches
+            ]
+        ),
+        "; ".join([f"{mi.serial_number} ({mi.asset_name})" for mi in r.missing_items]),
+        r.notes,
+    )
 
 
 def save_csv_report(
@@ -116,51 +197,11 @@ def save_csv_report(
 ) -> None:
     """Append results to a CSV report file."""
     p = Path(path)
-    write_header = not p.exists()
-
-    fieldnames = [
-        "timestamp",
-        "document_name",
-        "po_number",
-        "service_order_id",
-        "status",
-        "extraction_method",
-        "confidence",
-        "work_items_total",
-        "line_items_checked",
-        "line_items_matched",
-        "mismatches",
-        "missing_items",
-        "notes",
-    ]
-
+    rows = [_csv_row(r) for r in results]
     with open(p, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        if write_header:
-            writer.writeheader()
-        for r in results:
-            mismatch_str = "; ".join(
-                f"{m.serial_number}: ${m.po_price} vs ${m.expected_price}"
-                for m in r.mismatches
-            )
-            missing_str = "; ".join(
-                f"{mi.serial_number} ({mi.asset_name})" for mi in r.missing_items
-            )
-            writer.writerow(
-                {
-                    "timestamp": r.timestamp.isoformat(),
-                    "document_name": r.document_name,
-                    "po_number": r.po_number,
-                    "service_order_id": r.service_order_id,
-                    "status": r.status,
-                    "extraction_method": r.extraction_method,
-                    "confidence": f"{r.confidence:.2f}",
-                    "work_items_total": r.work_items_total,
-                    "line_items_checked": r.line_items_checked,
-                    "line_items_matched": r.line_items_matched,
-                    "mismatches": mismatch_str,
-                    "missing_items": missing_str,
-                    "notes": r.notes,
-                }
-            )
+        writer = csv.writer(f)
+        # Append mode positions at EOF, so tell() == 0 means new or empty file.
+        if f.tell() == 0:
+            writer.writerow(_CSV_FIELDNAMES)
+        writer.writerows(rows)
     logger.info("Appended %d results to %s", len(results), p)
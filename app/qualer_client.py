@@ -1,8 +1,8 @@
 # app/qualer_client.py
+import re
 from os import getenv
 from threading import Lock
 from typing import Optional
-from uuid import UUID
 from dotenv import load_dotenv
 from qualer_sdk.client import AuthenticatedClient
 from app.config import QUALER_ENDPOINT
@@ -14,6 +14,31 @@ _QUALER_CLIENT: Optional[AuthenticatedClient] = None
 _QUALER_CLIENT_LOCK = Lock()
 _QUALER_CLIENT_OVERRIDE: Optional[AuthenticatedClient] = None  # for tests/overrides
 
+# Strip /api suffix used by SDK internally
+_BASE_URL = QUALER_ENDPOINT.removesuffix("/api")
+
+# API tokens are UUIDs; hyphens and surrounding braces are optional, as in UUID().
+_UUID_RE = re.compile(
+    r"\A\{?[0-9a-f]{8}(?:-?[0-9a-f]{4}){3}-?[0-9a-f]{12}\}?\Z", re.IGNORECASE
+)
+
+
+def _build_qualer_client() -> AuthenticatedClient:
+    """Create a new AuthenticatedClient from the environment."""
+    # Get API token
+    api_token = getenv("QUALER_API_KEY")
+    if not api_token:
+        raise EnvironmentError("QUALER_API_KEY environment variable is not set")
+
+    # Validate token format
+    if not _UUID_RE.match(api_token):
+        raise ValueError("Invalid API token format")
+
+    return AuthenticatedClient(
+        token=api_token,
+        base_url=_BASE_URL,
+    )
+
 
 def make_qualer_client() -> AuthenticatedClient:
     """
@@ -33,41 +58,22 @@ def make_qualer_client() -> AuthenticatedClient:
     tests and replaying them via `@pytest.mark.vcr()`. Use `unittest.mock`
     sparingly for non-HTTP internal units.
     """
-    # Only _QUALER_CLIENT is assigned in this function; no need to declare
-    # _QUALER_CLIENT_OVERRIDE as global when just reading it.
     global _QUALER_CLIENT
 
     # Fast path without locking
     if _QUALER_CLIENT_OVERRIDE is not None:
         return _QUALER_CLIENT_OVERRIDE
-    if _QUALER_CLIENT is not None:
-        return _QUALER_CLIENT
+    client = _QUALER_CLIENT
+    if client is not None:
+        return client
 
     # Slow path: acquire lock and initialize once
     with _QUALER_CLIENT_LOCK:
         if _QUALER_CLIENT_OVERRIDE is not None:
             return _QUALER_CLIENT_OVERRIDE
         if _QUALER_CLIENT is None:
-            # Get API token
-
-            api_token = getenv("QUALER_API_KEY")
-            if not api_token:
-                raise EnvironmentError("QUALER_API_KEY environment variable is not set")
-
-            # Validate token format
-            try:
-                UUID(api_token)
-            except ValueError:
-                raise ValueError("Invalid API token format")
-
-            # Strip /api suffix used by SDK internally
-            base_url = QUALER_ENDPOINT.removesuffix("/api")
-
-            _QUALER_CLIENT = AuthenticatedClient(
-                token=api_token,
-                base_url=base_url,
-            )
-    return _QUALER_CLIENT
+            _QUALER_CLIENT = _build_qualer_client()
+        return _QUALER_CLIENT
 
 
 def set_qualer_client_override(client: Optional[AuthenticatedClient]) -> None:
@@ -83,4 +89,5 @@ def set_qualer_client_override(client: Optional[AuthenticatedClient]) -> None:
 def reset_qualer_client() -> None:
     """Clear the cached Qualer client (for test isolation or env changes)."""
     global _QUALER_CLIENT
-    _QUALER_CLIENT = None
+    with _QUALER_CLIENT_LOCK:
+        _QUALER_CLIENT = None
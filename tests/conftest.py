@@ -8,8 +8,6 @@ modules at module level (necessary because upload.py has module-level code).
 import sys
 import os
 import tempfile
-from unittest.mock import MagicMock
-
 import pytest
 
 
@@ -24,12 +22,8 @@ def pytest_configure(config):
 
     # Force import real app modules now, with patched config.
     # Some modules may fail to import if optional dependencies (fitz, tesseract)
-    # are not installed - that's OK, we just skip them.
-    # Mock fitz if not available (needed by app.orientation)
-    if "fitz" not in sys.modules:
-        mock_fitz = MagicMock()
-        sys.modules["fitz"] = mock_fitz
-
+    # are not installed - that's OK, we just skip them; the test modules that
+    # need PyMuPDF skip themselves via pytest.importorskip("fitz").
     for mod in [
         "app.color_print",
         "app.pdf",
@@ -52,6 +46,14 @@ def pytest_configure(config):
     }
 
 
+@pytest.fixture(scope="session")
+def qapp():
+    """One QApplication shared by every Qt widget test in the session."""
+    from PyQt6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
 @pytest.fixture(autouse=True)
 def _restore_real_app_modules(request):
     """Restore real app modules before each test, unless it's a test_upload test."""
@@ -59,11 +61,8 @@ def _restore_real_app_modules(request):
         yield
         return
 
-    real = request.config._real_app_modules
-    # Restore real modules that were replaced by mocks
-    for k, v in real.items():
-        if k in sys.modules and isinstance(sys.modules[k], MagicMock):
-            sys.modules[k] = v
-        elif k not in sys.modules:
-            sys.modules[k] = v
+    # Restore real modules that were replaced by mocks (or removed).  The
+    # snapshot holds the same objects the test modules bound at import, so a
+    # single bulk update is equivalent to restoring only the mocked entries.
+    sys.modules.update(request.config._real_app_modules)
     yield
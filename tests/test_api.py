@@ -2,15 +2,37 @@ import unittest
 from unittest.mock import patch, MagicMock
 import httpx
 
+from app.api import (
+    get_service_order,
+    get_service_order_document_list,
+    get_service_orders,
+    get_work_items,
+    getServiceOrderId,
+    handle_error,
+    handle_exception,
+    upload,
+)
+
+_LOCKED_BODY = (
+    b'{"Message": "This document version is locked and cannot be overwritten."}'
+)
+
+
+def _make_response(status_code, text="", content=b"", spec=None):
+    """Return a mock HTTP response with the given status and body."""
+    response = MagicMock(spec=spec)
+    response.status_code = status_code
+    response.text = text
+    response.content = content
+    return response
+
 
 class TestHandleError(unittest.TestCase):
     @patch("app.api.cp")
     def test_handle_error(self, mock_cp):
-        from app.api import handle_error
-
-        mock_response = MagicMock(spec=httpx.Response)
-        mock_response.status_code = 500
-        mock_response.text = "Internal Server Error"
+        mock_response = _make_response(
+            500, "Internal Server Error", spec=httpx.Response
+        )
 
         handle_error(mock_response)
         self.assertTrue(mock_cp.red.called)
@@ -19,26 +41,18 @@ class TestHandleError(unittest.TestCase):
 class TestHandleException(unittest.TestCase):
     @patch("app.api.cp")
     def test_handle_exception_with_response(self, mock_cp):
-        from app.api import handle_exception
-
-        mock_response = MagicMock(spec=httpx.Response)
-        mock_response.status_code = 400
-        mock_response.text = "Bad Request"
+        mock_response = _make_response(400, "Bad Request", spec=httpx.Response)
 
         handle_exception(ValueError("test"), mock_response)
         self.assertTrue(mock_cp.red.called)
 
     @patch("app.api.cp")
     def test_handle_exception_without_response(self, mock_cp):
-        from app.api import handle_exception
-
         handle_exception(ValueError("test"), None)
         self.assertTrue(mock_cp.red.called)
 
     @patch("app.api.cp")
     def test_handle_exception_with_invalid_response(self, mock_cp):
-        from app.api import handle_exception
-
         handle_exception(ValueError("test"), "not a response")
         self.assertTrue(mock_cp.red.called)
 
@@ -47,8 +61,6 @@ class TestGetServiceOrders(unittest.TestCase):
     @patch("app.api.get_work_orders.sync")
     @patch("app.api.cp")
     def test_get_service_orders_success(self, mock_cp, mock_sync):
-        from app.api import get_service_orders
-
         mock_so = MagicMock()
         mock_so.service_order_id = "SO1"
         mock_so.po_number = "PO100"
@@ -61,8 +73,6 @@ class TestGetServiceOrders(unittest.TestCase):
     @patch("app.api.get_work_orders.sync")
     @patch("app.api.cp")
     def test_get_service_orders_none_response(self, mock_cp, mock_sync):
-        from app.api import get_service_orders
-
         mock_sync.return_value = None
         result = get_service_orders(work_order_number="WO-999")
         self.assertEqual(result, [])
@@ -73,8 +83,6 @@ class TestGetServiceOrderId(unittest.TestCase):
     @patch("app.api.get_service_orders")
     @patch("app.api.cp")
     def test_get_service_order_id_found(self, mock_cp, mock_get_so):
-        from app.api import getServiceOrderId
-
         mock_so = MagicMock()
         mock_so.service_order_id = 12345
         mock_get_so.return_value = [mock_so]
@@ -84,8 +92,6 @@ class TestGetServiceOrderId(unittest.TestCase):
     @patch("app.api.get_service_orders")
     @patch("app.api.cp")
     def test_get_service_order_id_not_found(self, mock_cp, mock_get_so):
-        from app.api import getServiceOrderId
-
         mock_get_so.return_value = []
         result = getServiceOrderId("WO-999")
         self.assertIsNone(result)
@@ -95,8 +101,6 @@ class TestGetServiceOrder(unittest.TestCase):
     @patch("app.api._sdk_get_work_order.sync")
     @patch("app.api.cp")
     def test_get_service_order_success(self, mock_cp, mock_sync):
-        from app.api import get_service_order
-
         mock_so = MagicMock()
         mock_so.custom_order_number = "56561-083002"
         mock_sync.return_value = mock_so
@@ -108,8 +112,6 @@ class TestGetServiceOrder(unittest.TestCase):
     @patch("app.api._sdk_get_work_order.sync")
     @patch("app.api.cp")
     def test_get_service_order_not_found(self, mock_cp, mock_sync):
-        from app.api import get_service_order
-
         mock_sync.return_value = None
         result = get_service_order(999999)
         self.assertIsNone(result)
@@ -117,8 +119,6 @@ class TestGetServiceOrder(unittest.TestCase):
     @patch("app.api._sdk_get_work_order.sync", side_effect=Exception("API error"))
     @patch("app.api.cp")
     def test_get_service_order_exception(self, mock_cp, mock_sync):
-        from app.api import get_service_order
-
         result = get_service_order(123)
         self.assertIsNone(result)
 
@@ -129,11 +129,7 @@ class TestUpload(unittest.TestCase):
     @patch("app.api.path.exists", return_value=True)
     @patch("builtins.open", MagicMock())
     def test_upload_success(self, mock_exists, mock_cp, mock_sync_detailed):
-        from app.api import upload
-
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_sync_detailed.return_value = mock_response
+        mock_sync_detailed.return_value = _make_response(200)
 
         result, filepath = upload("/path/to/file.pdf", 123, "ordercertificate")
         self.assertTrue(result)
@@ -146,8 +142,6 @@ class TestUpload(unittest.TestCase):
     @patch("app.api.cp")
     @patch("app.api.path.exists", return_value=False)
     def test_upload_file_not_exists(self, mock_exists, mock_cp):
-        from app.api import upload
-
         result, filepath = upload("/nonexistent.pdf", 123, "ordercertificate")
         self.assertFalse(result)
 
@@ -165,19 +159,10 @@ class TestUpload(unittest.TestCase):
         mock_rename,
         mock_sync_detailed,
     ):
-        from app.api import upload
-        import json
-
-        locked_response = MagicMock()
-        locked_response.status_code = 400
-        locked_response.content = json.dumps(
-            {"Message": "This document version is locked and cannot be overwritten."}
-        ).encode()
-
-        success_response = MagicMock()
-        success_response.status_code = 200
-
-        mock_sync_detailed.side_effect = [locked_response, success_response]
+        mock_sync_detailed.side_effect = [
+            _make_response(400, content=_LOCKED_BODY),
+            _make_response(200),
+        ]
 
         result, filepath = upload("/path/to/file.pdf", 123, "ordercertificate")
         self.assertTrue(result)
@@ -188,11 +173,7 @@ class TestUpload(unittest.TestCase):
     @patch("builtins.open", MagicMock())
     def test_upload_private_flag(self, mock_exists, mock_cp, mock_sync_detailed):
         """Explicitly passing ``private=True`` should set the API parameter."""
-        from app.api import upload
-
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_sync_detailed.return_value = mock_response
+        mock_sync_detailed.return_value = _make_response(200)
 
         result, filepath = upload(
             "/path/to/file.pdf", 123, "ordercertificate", private=True
@@ -207,8 +188,6 @@ class TestGetServiceOrderDocumentList(unittest.TestCase):
     @patch("app.api.get_documents_list.sync")
     @patch("app.api.cp")
     def test_get_document_list_success(self, mock_cp, mock_sync):
-        from app.api import get_service_order_document_list
-
         doc1 = MagicMock()
         doc1.file_name = "doc1.pdf"
         doc2 = MagicMock()
@@ -220,16 +199,12 @@ class TestGetServiceOrderDocumentList(unittest.TestCase):
 
     @patch("app.api.cp")
     def test_get_document_list_no_service_order_raises(self, mock_cp):
-        from app.api import get_service_order_document_list
-
         with self.assertRaises(SystemExit):
             get_service_order_document_list(None)
 
     @patch("app.api.get_documents_list.sync")
     @patch("app.api.cp")
     def test_get_document_list_none_response(self, mock_cp, mock_sync):
-        from app.api import get_service_order_document_list
-
         mock_sync.return_value = None
         result = get_service_order_document_list(123)
         self.assertIsNone(result)
@@ -239,8 +214,6 @@ class TestGetWorkItems(unittest.TestCase):
     @patch("app.api._sdk_get_work_items.sync")
     @patch("app.api.cp")
     def test_get_work_items_success(self, mock_cp, mock_sync):
-        from app.api import get_work_items
-
         mock_item = MagicMock()
         mock_sync.return_value = [mock_item]
 
@@ -251,8 +224,6 @@ class TestGetWorkItems(unittest.TestCase):
     @patch("app.api._sdk_get_work_items.sync")
     @patch("app.api.cp")
     def test_get_work_items_none_response(self, mock_cp, mock_sync):
-        from app.api import get_work_items
-
         mock_sync.return_value = None
         result = get_work_items(456)
         self.assertEqual(result, [])
@@ -260,8 +231,6 @@ class TestGetWorkItems(unittest.TestCase):
     @patch("app.api._sdk_get_work_items.sync", side_effect=Exception("API error"))
     @patch("app.api.cp")
     def test_get_work_items_exception_returns_empty(self, mock_cp, mock_sync):
-        from app.api import get_work_items
-
         result = get_work_items(456)
         self.assertEqual(result, [])
 
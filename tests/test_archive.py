@@ -6,15 +6,24 @@ import tempfile
 import time
 import zipfile
 
+# A creation time safely before today, for files that should be archived.
+_OLD_CTIME = time.time() - 86400 * 2
+
 
 class TestMoveOldPdfs(unittest.TestCase):
     """Test the move_old_pdfs function from archive.py."""
 
-    def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
+    @classmethod
+    def setUpClass(cls):
+        cls.test_dir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
 
     def tearDown(self):
-        shutil.rmtree(self.test_dir, ignore_errors=True)
+        for name in os.listdir(self.test_dir):
+            os.remove(os.path.join(self.test_dir, name))
 
     @patch("app.archive.cp")
     def test_move_old_pdfs_no_files(self, mock_cp):
@@ -33,31 +42,29 @@ class TestMoveOldPdfs(unittest.TestCase):
         move_old_pdfs(self.test_dir)
         self.assertTrue(os.path.exists(pdf_path))
 
+    @patch("app.archive.os.path.getctime", return_value=_OLD_CTIME)
     @patch("app.archive.cp")
-    def test_move_old_pdfs_delete_mode(self, mock_cp):
+    def test_move_old_pdfs_delete_mode(self, mock_cp, mock_getctime):
         from app.archive import move_old_pdfs
 
         pdf_path = os.path.join(self.test_dir, "old.pdf")
         with open(pdf_path, "w") as f:
             f.write("test")
 
-        yesterday = time.time() - 86400 * 2
-        with patch("app.archive.os.path.getctime", return_value=yesterday):
-            move_old_pdfs(self.test_dir, delete_mode=True)
+        move_old_pdfs(self.test_dir, delete_mode=True)
 
         self.assertFalse(os.path.exists(pdf_path))
 
+    @patch("app.archive.os.path.getctime", return_value=_OLD_CTIME)
     @patch("app.archive.cp")
-    def test_move_old_pdfs_archive_mode(self, mock_cp):
+    def test_move_old_pdfs_archive_mode(self, mock_cp, mock_getctime):
         from app.archive import move_old_pdfs
 
         pdf_path = os.path.join(self.test_dir, "old.pdf")
         with open(pdf_path, "w") as f:
             f.write("test content")
 
-        yesterday = time.time() - 86400 * 2
-        with patch("app.archive.os.path.getctime", return_value=yesterday):
-            move_old_pdfs(self.test_dir, delete_mode=False)
+        move_old_pdfs(self.test_dir, delete_mode=False)
 
         self.assertFalse(os.path.exists(pdf_path))
         zip_path = os.path.join(self.test_dir, "Archive.zip")
@@ -65,17 +72,16 @@ class TestMoveOldPdfs(unittest.TestCase):
         with zipfile.ZipFile(zip_path, "r") as z:
             self.assertIn("old.pdf", z.namelist())
 
+    @patch("app.archive.os.path.getctime", return_value=_OLD_CTIME)
     @patch("app.archive.cp")
-    def test_move_old_pdfs_non_pdf_ignored(self, mock_cp):
+    def test_move_old_pdfs_non_pdf_ignored(self, mock_cp, mock_getctime):
         from app.archive import move_old_pdfs
 
         txt_path = os.path.join(self.test_dir, "old.txt")
         with open(txt_path, "w") as f:
             f.write("test")
 
-        yesterday = time.time() - 86400 * 2
-        with patch("app.archive.os.path.getctime", return_value=yesterday):
-            move_old_pdfs(self.test_dir, delete_mode=True)
+        move_old_pdfs(self.test_dir, delete_mode=True)
 
         self.assertTrue(os.path.exists(txt_path))
 
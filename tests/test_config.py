@@ -1,6 +1,8 @@
 import os
 import unittest
 
+import pytest
+
 
 class TestConfig(unittest.TestCase):
     def test_config_has_required_attributes(self):
@@ -49,6 +51,16 @@ class TestConfig(unittest.TestCase):
             self.assertIsInstance(wf.qualer_document_type, str)
             self.assertIsInstance(wf.validate_po, bool)
 
+    def test_watched_folder_is_immutable(self):
+        from dataclasses import FrozenInstanceError
+
+        from app.config_manager import WatchedFolder
+
+        wf = WatchedFolder("in", "out", "reject")
+        with self.assertRaises(FrozenInstanceError):
+            wf.input_dir = "other"
+        self.assertFalse(hasattr(wf, "__dict__"))
+
 
 class TestDevSecrets(unittest.TestCase):
     """Tests for secret loading in development (non-frozen) mode."""
@@ -237,6 +249,7 @@ class TestEncryptedSecrets(unittest.TestCase):
         self.assertEqual(result, {})
 
 
+@pytest.mark.usefixtures("qapp")
 class TestConfigDialogObfuscation(unittest.TestCase):
     """UI-level checks that API key fields are never pre-populated."""
 
@@ -244,8 +257,8 @@ class TestConfigDialogObfuscation(unittest.TestCase):
     def setUpClass(cls):
         from PyQt6.QtWidgets import QApplication
 
-        if QApplication.instance() is None:
-            cls._app = QApplication([])
+        # The qapp fixture covers pytest; this keeps unittest.main() working.
+        cls._app = QApplication.instance() or QApplication([])
 
     def _make_dialog(self, qualer="", gemini=""):
         from unittest.mock import patch
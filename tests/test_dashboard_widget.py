@@ -1,22 +1,47 @@
 import unittest
+from dataclasses import dataclass, field
 from datetime import datetime
 
-from PyQt6.QtWidgets import QApplication
+import pytest
 from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QApplication
 
 from app.gui.dashboard_widget import DashboardWidget
 from app.event_bus import ProcessingEvent
 
 
+@dataclass
+class _VStub:
+    """Stand-in for ValidationResult with just the fields the GUI reads."""
+
+    status: str = "pass"
+    po_number: str = ""
+    document_name: str = ""
+    service_order_id: int = 0
+    extraction_method: str = ""
+    confidence: float = 0.0
+    line_items_checked: int = 0
+    work_items_total: int = 0
+    line_items_matched: int = 0
+    notes: str = ""
+    mismatches: list = field(default_factory=list)
+    missing_items: list = field(default_factory=list)
+
+
+@pytest.mark.usefixtures("qapp")
 class TestDashboardWidget(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        # ensure a QApplication exists for widget instantiation
-        if QApplication.instance() is None:
-            cls._app = QApplication([])
+        # The qapp fixture covers pytest; this keeps plain unittest working.
+        cls._app = QApplication.instance() or QApplication([])
+        cls.widget = DashboardWidget()
 
     def setUp(self):
-        self.widget = DashboardWidget()
+        # Reuse the widget; reset its events, rows and counters instead.
+        self.widget._events.clear()
+        self.widget.table.clearContents()
+        self.widget.table.setRowCount(0)
+        self.widget.summary_bar.update_counts([])
 
     def make_event(self, status):
         return ProcessingEvent(
@@ -24,7 +49,7 @@ class TestDashboardWidget(unittest.TestCase):
             filename="file.pdf",
             timestamp=datetime.now(),
             success=True,
-            validation_result=type("V", (), {"status": status})(),
+            validation_result=_VStub(status=status),
         )
 
     def test_validation_status_formats_text(self):
@@ -65,24 +90,17 @@ class TestDashboardWidget(unittest.TestCase):
             filename="PO123.pdf",
             timestamp=datetime.now(),
             success=True,
-            validation_result=type(
-                "V",
-                (),
-                {
-                    "status": "pass",
-                    "po_number": "123",
-                    "document_name": "PO123.pdf",
-                    "service_order_id": 100,
-                    "extraction_method": "ocr",
-                    "confidence": 0.9,
-                    "line_items_checked": 1,
-                    "work_items_total": 1,
-                    "line_items_matched": 1,
-                    "notes": "",
-                    "mismatches": [],
-                    "missing_items": [],
-                },
-            )(),
+            validation_result=_VStub(
+                status="pass",
+                po_number="123",
+                document_name="PO123.pdf",
+                service_order_id=100,
+                extraction_method="ocr",
+                confidence=0.9,
+                line_items_checked=1,
+                work_items_total=1,
+                line_items_matched=1,
+            ),
         )
         evt_cert = ProcessingEvent(
             filepath="/tmp/cert.pdf",
@@ -129,11 +147,11 @@ class TestDashboardWidget(unittest.TestCase):
         self.assertIsNotNone(self.widget.table.cellWidget(1, 4))
 
 
+@pytest.mark.usefixtures("qapp")
 class TestDetailDialog(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        if QApplication.instance() is None:
-            cls._app = QApplication([])
+        cls._app = QApplication.instance() or QApplication([])
 
     def test_non_po_dialog(self):
         """DetailDialog should render without crashing for non-PO events."""
@@ -155,24 +173,17 @@ class TestDetailDialog(unittest.TestCase):
         """DetailDialog should render PO-specific fields when validation_result exists."""
         from app.gui.detail_dialog import DetailDialog
 
-        result = type(
-            "V",
-            (),
-            {
-                "status": "pass",
-                "po_number": "PO-999",
-                "document_name": "PO999.pdf",
-                "service_order_id": 42,
-                "extraction_method": "ocr",
-                "confidence": 0.95,
-                "line_items_checked": 3,
-                "work_items_total": 5,
-                "line_items_matched": 3,
-                "notes": "",
-                "mismatches": [],
-                "missing_items": [],
-            },
-        )()
+        result = _VStub(
+            status="pass",
+            po_number="PO-999",
+            document_name="PO999.pdf",
+            service_order_id=42,
+            extraction_method="ocr",
+            confidence=0.95,
+            line_items_checked=3,
+            work_items_total=5,
+            line_items_matched=3,
+        )
         evt = ProcessingEvent(
             filepath="/tmp/PO999.pdf",
             filename="PO999.pdf",
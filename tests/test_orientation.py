@@ -1,14 +1,19 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 
+import pytest
+
+pytest.importorskip("fitz")  # app.orientation imports PyMuPDF
+
 
 class TestGetPdfOrientation(unittest.TestCase):
     @patch("app.orientation.get_visual_orientation", return_value=90)
     @patch("app.orientation.get_text_orientation", return_value=None)
-    @patch("app.orientation.convert_to_grayscale")
     @patch("app.orientation.convert_pdf_to_image")
     def test_falls_back_to_visual_when_text_fails(
-        self, mock_convert, mock_gray, mock_text, mock_visual
+        self, mock_convert, mock_text, mock_visual
     ):
         from app.orientation import get_pdf_orientation
 
@@ -16,35 +21,112 @@ class TestGetPdfOrientation(unittest.TestCase):
         mock_visual.assert_called_once()
 
     @patch("app.orientation.get_text_orientation", return_value=180)
-    @patch("app.orientation.convert_to_grayscale")
     @patch("app.orientation.convert_pdf_to_image")
-    def test_uses_text_orientation_when_available(
-        self, mock_convert, mock_gray, mock_text
-    ):
+    def test_uses_text_orientation_when_available(self, mock_convert, mock_text):
         from app.orientation import get_pdf_orientation
 
         self.assertEqual(get_pdf_orientation("/test.pdf"), 180)
 
     @patch("app.orientation.get_text_orientation", return_value=0)
-    @patch("app.orientation.convert_to_grayscale")
     @patch("app.orientation.convert_pdf_to_image")
-    def test_zero_orientation(self, mock_convert, mock_gray, mock_text):
+    def test_zero_orientation(self, mock_convert, mock_text):
         from app.orientation import get_pdf_orientation
 
         self.assertEqual(get_pdf_orientation("/test.pdf"), 0)
 
 
-class TestConvertToGrayscale(unittest.TestCase):
-    def test_converts_to_grayscale(self):
-        from app.orientation import convert_to_grayscale
+class TestOrientationCache(unittest.TestCase):
+    def setUp(self):
+        import app.orientation as orientation
 
-        mock_image = MagicMock()
-        mock_gray = MagicMock()
-        mock_image.convert.return_value = mock_gray
+        orientation._orientation_cache.clear()
+        fd, self.path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"%PDF-1.4 test content")
+
+    def tearDown(self):
+        import app.orientation as orientation
+
+        orientation._orientation_cache.clear()
+        os.remove(self.path)
+
+    @patch("app.orientation._detect_pdf_orientation", return_value=180)
+    def test_same_content_detected_once(self, mock_detect):
+        from app.orientation import get_pdf_orientation
+
+        self.assertEqual(get_pdf_orientation(self.path), 180)
+        self.assertEqual(get_pdf_orientation(self.path), 180)
+        mock_detect.assert_called_once()
+
+    @patch("app.orientation._detect_pdf_orientation", return_value=None)
+    def test_failed_detection_not_cached(self, mock_detect):
+        from app.orientation import get_pdf_orientation
+
+        self.assertIsNone(get_pdf_orientation(self.path))
+        self.assertIsNone(get_pdf_orientation(self.path))
+        self.assertEqual(mock_detect.call_count, 2)
+
+    @patch("app.orientation._detect_pdf_orientation", return_value=90)
+    def test_changed_content_misses_cache(self, mock_detect):
+        from app.orientation import get_pdf_orientation
+
+        get_pdf_orientation(self.path)
+        with open(self.path, "ab") as f:
+            f.write(b" more")
+        get_pdf_orientation(self.path)
+        self.assertEqual(mock_detect.call_count, 2)
 
-        result = convert_to_grayscale(mock_image)
-        mock_image.convert.assert_called_with("L")
-        self.assertEqual(result, mock_gray)
+
+class TestGetVisualOrientation(unittest.TestCase):
+    @patch("app.orientation.cv2")
+    def test_dominant_angle(self, mock_cv2):
+        import numpy as np
+        from app.orientation import get_visual_orientation
+
+        thetas = np.deg2rad([90.2, 90.4, 0.1, 90.7, 45.0])
+        mock_cv2.HoughLines.return_value = np.array(
+            [[[10.0, t]] for t in thetas], dtype=np.float32
+        )
+        image = np.zeros((100, 100), dtype=np.uint8)
+        self.assertEqual(get_visual_orientation(image), 90)
+
+    def test_large_image_downscaled_before_canny(self):
+        import cv2
+        import numpy as np
+        from app.orientation import get_visual_orientation
+
+        image = np.zeros((3300, 2550), dtype=np.uint8)
+        for y in range(0, 3300, 100):
+            image[y : y + 6, :] = 255  # horizontal rules
+        with patch("app.orientation.cv2.Canny", wraps=cv2.Canny) as mock_canny:
+            self.assertEqual(get_visual_orientation(image), 90)
+        self.assertLessEqual(max(mock_canny.call_args.args[0].shape), 1000)
+
+    @patch("app.orientation.cv2")
+    def test_no_lines(self, mock_cv2):
+        import numpy as np
+        from app.orientation import get_visual_orientation
+
+        mock_cv2.HoughLines.return_value = None
+        self.assertIsNone(get_visual_orientation(np.zeros((10, 10), dtype=np.uint8)))
+
+
+class TestConvertPdfToImage(unittest.TestCase):
+    @patch("app.orientation.fopen")
+    def test_renders_grayscale(self, mock_open):
+        import app.orientation as orientation
+
+        pix = MagicMock(width=4, height=2, samples=bytes(8))
+        page = mock_open.return_value.load_page.return_value
+        page.get_pixmap.return_value = pix
+
+        image = orientation.convert_pdf_to_image("/test.pdf")
+        self.assertEqual(image.mode, "L")
+        self.assertEqual(image.size, (4, 2))
+        self.assertIs(
+            page.get_pixmap.call_args.kwargs["colorspace"], orientation.csGRAY
+        )
+        mock_open.return_value.close.assert_called_once()
 
 
 class TestReorientPdfForWorkorders(unittest.TestCase):
@@ -113,17 +195,10 @@ class TestReorientPdfForWorkorders(unittest.TestCase):
 
 
 class TestGetTextOrientation(unittest.TestCase):
-    @patch("app.orientation.os.remove")
     @patch("app.orientation.image_to_osd")
-    @patch("app.orientation.tempfile.NamedTemporaryFile")
-    def test_valid_rotation(self, mock_tmp, mock_osd, mock_remove):
+    def test_valid_rotation(self, mock_osd):
         from app.orientation import get_text_orientation
 
-        mock_ctx = MagicMock()
-        mock_ctx.__enter__ = MagicMock(return_value=MagicMock(name="tmp.png"))
-        mock_ctx.__exit__ = MagicMock(return_value=False)
-        mock_tmp.return_value = mock_ctx
-
         mock_osd.return_value = (
             "Page number: 0\n"
             "Orientation in degrees: 0\n"
@@ -135,39 +210,40 @@ class TestGetTextOrientation(unittest.TestCase):
         mock_image = MagicMock()
         result = get_text_orientation(mock_image)
         self.assertEqual(result, 180)
+        mock_osd.assert_called_once_with(mock_image)
+        mock_image.save.assert_not_called()
 
-    @patch("app.orientation.os.remove")
     @patch("app.orientation.image_to_osd")
-    @patch("app.orientation.tempfile.NamedTemporaryFile")
-    def test_no_rotation_line(self, mock_tmp, mock_osd, mock_remove):
+    def test_no_rotation_line(self, mock_osd):
         from app.orientation import get_text_orientation
 
-        mock_ctx = MagicMock()
-        mock_ctx.__enter__ = MagicMock(return_value=MagicMock(name="tmp.png"))
-        mock_ctx.__exit__ = MagicMock(return_value=False)
-        mock_tmp.return_value = mock_ctx
         mock_osd.return_value = "Page number: 0\nScript: Latin\n"
 
         result = get_text_orientation(MagicMock())
         self.assertIsNone(result)
 
     @patch("app.orientation.cp")
-    @patch("app.orientation.os.remove")
     @patch("app.orientation.image_to_osd")
-    @patch("app.orientation.tempfile.NamedTemporaryFile")
-    def test_tesseract_error(self, mock_tmp, mock_osd, mock_remove, mock_cp):
+    def test_tesseract_error(self, mock_osd, mock_cp):
         from app.orientation import get_text_orientation
         from pytesseract import TesseractError
 
-        mock_ctx = MagicMock()
-        mock_ctx.__enter__ = MagicMock(return_value=MagicMock(name="tmp.png"))
-        mock_ctx.__exit__ = MagicMock(return_value=False)
-        mock_tmp.return_value = mock_ctx
         mock_osd.side_effect = TesseractError("status", "message")
 
         result = get_text_orientation(MagicMock())
         self.assertIsNone(result)
 
+    @patch("app.orientation.image_to_osd")
+    @patch("app.pdf.PSM")
+    @patch("app.pdf.PyTessBaseAPI")
+    def test_tesserocr_fast_path(self, mock_api_cls, mock_psm, mock_osd):
+        from app.orientation import get_text_orientation
+
+        api = mock_api_cls.return_value.__enter__.return_value
+        api.DetectOrientationScript.return_value = {"orient_deg": 90}
+        self.assertEqual(get_text_orientation(MagicMock()), 270)
+        mock_osd.assert_not_called()
+
 
 class TestRotatePdf(unittest.TestCase):
     @patch("app.orientation.cp")
@@ -178,10 +254,13 @@ class TestRotatePdf(unittest.TestCase):
         self.assertFalse(result)
 
     @patch("app.orientation.cp")
+    @patch("app.orientation.os.replace")
     @patch("app.orientation.open_with_debug")
     @patch("app.orientation.PdfWriter")
     @patch("app.orientation.PdfReader")
-    def test_rotate_pdf_success(self, mock_reader, mock_writer, mock_open, mock_cp):
+    def test_rotate_pdf_success(
+        self, mock_reader, mock_writer, mock_open, mock_replace, mock_cp
+    ):
         from app.orientation import rotate_pdf
 
         mock_page = MagicMock()
@@ -190,6 +269,7 @@ class TestRotatePdf(unittest.TestCase):
         mock_reader.return_value = mock_reader_instance
 
         mock_writer_instance = MagicMock()
+        mock_writer_instance.pages = [mock_page]
         mock_writer.return_value = mock_writer_instance
 
         mock_file = MagicMock()
@@ -198,6 +278,29 @@ class TestRotatePdf(unittest.TestCase):
 
         result = rotate_pdf("/path/to/file.pdf", degrees=180)
         self.assertTrue(result)
+        mock_page.rotate.assert_called_once_with(180)
+        mock_replace.assert_called_once_with(
+            "/path/to/file.pdf.rot.tmp", "/path/to/file.pdf"
+        )
+
+    @patch("app.orientation.cp")
+    def test_rotate_pdf_on_disk(self, mock_cp):
+        from pypdf import PdfReader, PdfWriter
+        from app.orientation import rotate_pdf
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "scan.pdf")
+            writer = PdfWriter()
+            writer.add_blank_page(612, 792)
+            writer.add_blank_page(612, 792)
+            with open(path, "wb") as f:
+                writer.write(f)
+
+            self.assertTrue(rotate_pdf(path, degrees=90))
+            self.assertEqual(
+                [page.rotation for page in PdfReader(path).pages], [90, 90]
+            )
+            self.assertEqual(os.listdir(tmpdir), ["scan.pdf"])
 
 
 if __name__ == "__main__":
@@ -7,31 +7,47 @@ import tempfile
 class TestPdfNext(unittest.TestCase):
     """Test the next() generator that yields PDF file paths."""
 
-    @patch("os.fsdecode", side_effect=lambda f: f)
-    @patch("os.listdir", return_value=["file1.pdf", "file2.txt", "file3.PDF"])
-    def test_next_yields_pdf_files(self, mock_listdir, mock_fsdecode):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self._tmpdir.name
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _touch(self, *names):
+        for name in names:
+            open(os.path.join(self.dir, name), "w").close()
+
+    def test_next_yields_pdf_files(self):
         from app.pdf import next as pdf_next
 
-        results = list(pdf_next("/test/dir"))
+        self._touch("file1.pdf", "file2.txt", "file3.PDF")
+        results = sorted(pdf_next(self.dir))
         self.assertEqual(len(results), 2)
         self.assertTrue(results[0].endswith("file1.pdf"))
         self.assertTrue(results[1].endswith("file3.PDF"))
 
-    @patch("os.fsdecode", side_effect=lambda f: f)
-    @patch("os.listdir", return_value=["file1.txt", "file2.doc"])
-    def test_next_no_pdfs(self, mock_listdir, mock_fsdecode):
+    def test_next_no_pdfs(self):
         from app.pdf import next as pdf_next
 
-        results = list(pdf_next("/test/dir"))
+        self._touch("file1.txt", "file2.doc")
+        results = list(pdf_next(self.dir))
         self.assertEqual(len(results), 0)
 
-    @patch("os.listdir", return_value=[])
-    def test_next_empty_dir(self, mock_listdir):
+    def test_next_empty_dir(self):
         from app.pdf import next as pdf_next
 
-        results = list(pdf_next("/test/dir"))
+        results = list(pdf_next(self.dir))
         self.assertEqual(len(results), 0)
 
+    def test_next_skips_directories(self):
+        from app.pdf import next as pdf_next
+
+        os.mkdir(os.path.join(self.dir, "folder.pdf"))
+        self._touch("file.pdf")
+        results = list(pdf_next(self.dir))
+        self.assertEqual(results, [os.path.join(self.dir, "file.pdf")])
+
 
 class TestIncrementFilename(unittest.TestCase):
     """Test the increment_filename function."""
@@ -60,6 +76,18 @@ class TestIncrementFilename(unittest.TestCase):
         result = increment_filename("/path/to/file (99).pdf")
         self.assertEqual(result, "/path/to/file (100).pdf")
 
+    def test_increment_past_99(self):
+        from app.file_ops import increment_filename
+
+        result = increment_filename("/path/to/file (150).pdf")
+        self.assertEqual(result, "/path/to/file (151).pdf")
+
+    def test_increment_uppercase_extension(self):
+        from app.file_ops import increment_filename
+
+        result = increment_filename("/path/to/file.PDF")
+        self.assertEqual(result, "/path/to/file (1).PDF")
+
 
 class TestTryRename(unittest.TestCase):
     """Test the try_rename function."""
@@ -199,41 +227,123 @@ class TestWorkorders(unittest.TestCase):
 class TestMoveFile(unittest.TestCase):
     """Test the move_file function."""
 
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.src_dir = os.path.join(self._tmpdir.name, "src")
+        self.dst_dir = os.path.join(self._tmpdir.name, "dst")
+        os.mkdir(self.src_dir)
+        os.mkdir(self.dst_dir)
+        self.src = os.path.join(self.src_dir, "file.pdf")
+        with open(self.src, "wb") as f:
+            f.write(b"%PDF-1.4 source")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
     @patch("app.file_ops.cp")
-    @patch("os.rename")
-    def test_move_file_success(self, mock_rename, mock_cp):
+    def test_move_file_success(self, mock_cp):
         from app.file_ops import move_file
 
-        path = move_file("/src/file.pdf", "/dst")
-        expected_dst = os.path.join("/dst", "file.pdf")
-        mock_rename.assert_called_once_with("/src/file.pdf", expected_dst)
+        path = move_file(self.src, self.dst_dir)
+        expected_dst = os.path.join(self.dst_dir, "file.pdf")
         self.assertEqual(path, expected_dst)
-        assert path != "/src/file.pdf"
+        self.assertFalse(os.path.exists(self.src))
+        with open(expected_dst, "rb") as f:
+            self.assertEqual(f.read(), b"%PDF-1.4 source")
 
     @patch("app.file_ops.sleep")
     @patch("app.file_ops.cp")
-    @patch("os.rename", side_effect=FileNotFoundError("not found"))
-    def test_move_file_not_found(self, mock_rename, mock_cp, mock_sleep):
+    def test_move_file_not_found(self, mock_cp, mock_sleep):
+        from app.file_ops import move_file
+
+        os.remove(self.src)
+        path = move_file(self.src, self.dst_dir)
+        self.assertEqual(path, self.src)
+        self.assertEqual(os.listdir(self.dst_dir), [])
+
+    @patch("app.file_ops.cp")
+    def test_move_file_file_exists_gets_suffix(self, mock_cp):
         from app.file_ops import move_file
 
-        path = move_file("/src/file.pdf", "/dst")
-        self.assertEqual(path, "/src/file.pdf")
-        assert path == "/src/file.pdf"
+        existing = os.path.join(self.dst_dir, "file.pdf")
+        with open(existing, "wb") as f:
+            f.write(b"existing")
+
+        path = move_file(self.src, self.dst_dir)
+        self.assertEqual(path, os.path.join(self.dst_dir, "file (1).pdf"))
+        with open(existing, "rb") as f:
+            self.assertEqual(f.read(), b"existing")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"%PDF-1.4 source")
 
-    @patch("app.file_ops.increment_filename", return_value="/dst/file (1).pdf")
     @patch("app.file_ops.sleep")
     @patch("app.file_ops.cp")
-    @patch("builtins.print")
-    @patch("os.rename")
-    def test_move_file_file_exists_then_succeeds(
-        self, mock_rename, mock_print, mock_cp, mock_sleep, mock_increment
-    ):
+    def test_move_file_retries_permission_error(self, mock_cp, mock_sleep):
+        import app.file_ops as file_ops
+
+        real_rename = file_ops._rename_no_clobber
+        calls = []
+
+        def locked_once(src, dst):
+            calls.append(dst)
+            if len(calls) == 1:
+                raise PermissionError("locked")
+            real_rename(src, dst)
+
+        # Nothing may appear in the output folder while the source is locked.
+        mock_sleep.side_effect = lambda _: self.assertEqual(
+            os.listdir(self.dst_dir), []
+        )
+        with patch.object(file_ops, "_rename_no_clobber", side_effect=locked_once):
+            path = file_ops.move_file(self.src, self.dst_dir)
+        self.assertEqual(path, os.path.join(self.dst_dir, "file.pdf"))
+        self.assertEqual(len(calls), 2)
+        mock_sleep.assert_called_once()
+        self.assertLess(mock_sleep.call_args.args[0], 1)
+
+    @patch("app.file_ops.sleep")
+    @patch("app.file_ops.cp")
+    def test_move_file_gives_up_without_leaving_files(self, mock_cp, mock_sleep):
+        import app.file_ops as file_ops
+
+        with patch.object(
+            file_ops, "_rename_no_clobber", side_effect=PermissionError("locked")
+        ):
+            path = file_ops.move_file(self.src, self.dst_dir)
+        self.assertEqual(path, self.src)
+        self.assertEqual(os.listdir(self.dst_dir), [])
+        self.assertEqual(mock_sleep.call_count, 50)
+
+    @patch("app.file_ops.sleep")
+    @patch("app.file_ops.cp")
+    def test_move_file_name_collisions_are_bounded(self, mock_cp, mock_sleep):
+        import app.file_ops as file_ops
+
+        with patch.object(
+            file_ops, "_rename_no_clobber", side_effect=FileExistsError("taken")
+        ) as mock_rename:
+            path = file_ops.move_file(self.src, self.dst_dir)
+        self.assertEqual(path, self.src)
+        self.assertEqual(mock_rename.call_count, 50)
+        mock_sleep.assert_not_called()
+
+    @patch("app.file_ops.cp")
+    def test_move_file_without_hard_links(self, mock_cp):
+        import errno
+
         from app.file_ops import move_file
 
-        mock_rename.side_effect = [FileExistsError, None]
-        path = move_file("/src/file.pdf", "/dst")
-        self.assertEqual(path, "/dst/file (1).pdf")
-        assert path != "/src/file.pdf"
+        existing = os.path.join(self.dst_dir, "file.pdf")
+        with open(existing, "wb") as f:
+            f.write(b"existing")
+        with patch(
+            "app.file_ops.os.link", side_effect=OSError(errno.EXDEV, "cross-device")
+        ):
+            path = move_file(self.src, self.dst_dir)
+        self.assertEqual(path, os.path.join(self.dst_dir, "file (1).pdf"))
+        self.assertFalse(os.path.exists(self.src))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"%PDF-1.4 source")
 
 
 class TestExtract(unittest.TestCase):
@@ -269,6 +379,230 @@ class TestExtract(unittest.TestCase):
         self.assertEqual(result, ["OCR extracted text"])
         mock_ocr.assert_called_once()
 
+    @patch("app.pdf.tesseractOcr", return_value=["a", "b", "c", "d", "e"])
+    @patch("app.pdf.cp")
+    @patch("app.pdf.PdfReader")
+    def test_extract_stops_parsing_scanned_pdf_early(
+        self, mock_reader_class, mock_cp, mock_ocr
+    ):
+        from app.pdf import extract
+
+        pages = [MagicMock() for _ in range(5)]
+        for page in pages:
+            page.extract_text.return_value = ""
+        mock_reader_class.return_value.pages = pages
+
+        result = extract("/path/to/file.pdf")
+        self.assertEqual(result, ["a", "b", "c", "d", "e"])
+        pages[1].extract_text.assert_called_once()
+        for page in pages[2:]:
+            page.extract_text.assert_not_called()
+
+
+class TestTesseractOcr(unittest.TestCase):
+    """Test OCR of rendered PDF pages."""
+
+    @patch("app.pdf._ocr_batch", side_effect=lambda imgs: [f"text {i}" for i in imgs])
+    @patch("app.pdf._pdf_to_img", return_value=["p0", "p1", "p2", "p3", "p4"])
+    def test_multi_page_preserves_order(self, mock_to_img, mock_batch):
+        from app.pdf import tesseractOcr
+
+        result = tesseractOcr("/path/to/file.pdf")
+        self.assertEqual(
+            result, ["text p0", "text p1", "text p2", "text p3", "text p4"]
+        )
+        batched = [p for call in mock_batch.call_args_list for p in call.args[0]]
+        self.assertEqual(sorted(batched), ["p0", "p1", "p2", "p3", "p4"])
+
+    @patch("app.pdf._ocr_batch")
+    @patch("app.pdf._pdf_to_img", return_value=[])
+    def test_no_pages(self, mock_to_img, mock_batch):
+        from app.pdf import tesseractOcr
+
+        self.assertEqual(tesseractOcr("/path/to/file.pdf"), [])
+        mock_batch.assert_not_called()
+
+    @patch("app.pdf.image_to_string")
+    @patch("app.pdf.subprocess.run")
+    def test_batch_splits_pages_on_form_feed(self, mock_run, mock_ocr):
+        from app.pdf import _ocr_batch
+
+        mock_run.return_value = MagicMock(stdout=b"page one\x0cpage two\x0c")
+        result = _ocr_batch([MagicMock(), MagicMock()])
+        self.assertEqual(result, ["page one", "page two"])
+        mock_run.assert_called_once()
+        mock_ocr.assert_not_called()
+
+    @patch("app.pdf.cp")
+    @patch("app.pdf.image_to_string", side_effect=["a", "b"])
+    @patch("app.pdf.subprocess.run", side_effect=OSError("tesseract missing"))
+    def test_batch_falls_back_to_per_page(self, mock_run, mock_ocr, mock_cp):
+        from app.pdf import _ocr_batch
+
+        result = _ocr_batch([MagicMock(), MagicMock()])
+        self.assertEqual(result, ["a", "b"])
+        self.assertEqual(mock_ocr.call_count, 2)
+
+    @patch("app.pdf._ocr_images", return_value=["first", "third"])
+    def test_batch_unrendered_pages_give_empty_text(self, mock_ocr_images):
+        from app.pdf import _ocr_batch
+
+        result = _ocr_batch(["img0", None, "img2"])
+        self.assertEqual(result, ["first", "", "third"])
+        mock_ocr_images.assert_called_once_with(["img0", "img2"])
+
+    @patch("app.pdf.subprocess.run")
+    @patch("app.pdf.PyTessBaseAPI")
+    def test_batch_uses_tesserocr_when_available(self, mock_api_cls, mock_run):
+        from app.pdf import _ocr_batch
+
+        api = mock_api_cls.return_value.__enter__.return_value
+        api.GetUTF8Text.side_effect = ["first", "second"]
+        result = _ocr_batch(["img0", "img1"])
+        self.assertEqual(result, ["first", "second"])
+        mock_api_cls.assert_called_once()
+        mock_run.assert_not_called()
+
+
+class TestPdfToImg(unittest.TestCase):
+    """Test lazy page rendering."""
+
+    @patch("app.pdf.convert_from_path")
+    @patch("app.pdf.PdfDocument")
+    def test_yields_pages_lazily(self, mock_doc_cls, mock_convert):
+        from app.pdf import _pdf_to_img
+
+        doc = mock_doc_cls.return_value
+        doc.__len__.return_value = 3
+        doc.get_page.return_value.render.return_value.to_pil.side_effect = [
+            "img0",
+            "img1",
+            "img2",
+        ]
+        pages = _pdf_to_img("/path/to/file.pdf")
+        self.assertEqual(list(pages), ["img0", "img1", "img2"])
+        doc.close.assert_called_once()
+        mock_convert.assert_not_called()
+
+    @patch("app.pdf.PdfDocument")
+    def test_renders_at_requested_dpi(self, mock_doc_cls):
+        from app.pdf import _pdf_to_img
+
+        doc = mock_doc_cls.return_value
+        doc.__len__.return_value = 1
+        list(_pdf_to_img("/path/to/file.pdf", dpi=144))
+        render = doc.get_page.return_value.render
+        self.assertEqual(render.call_args.kwargs["scale"], 2)
+
+    @patch("app.pdf.cp")
+    @patch("app.pdf.convert_from_path", return_value=["fallback1"])
+    @patch("app.pdf.PdfDocument")
+    def test_bad_page_rendered_alone_with_pdf2image(
+        self, mock_doc_cls, mock_convert, mock_cp
+    ):
+        from app.pdf import _pdf_to_img
+
+        doc = mock_doc_cls.return_value
+        doc.__len__.return_value = 3
+        good_pages = [MagicMock(), MagicMock()]
+        good_pages[0].render.return_value.to_pil.return_value = "img0"
+        good_pages[1].render.return_value.to_pil.return_value = "img2"
+        bad_page = MagicMock()
+        bad_page.render.side_effect = RuntimeError("bad page")
+        doc.get_page.side_effect = [good_pages[0], bad_page, good_pages[1]]
+
+        pages = list(_pdf_to_img("/path/to/file.pdf"))
+        self.assertEqual(pages, ["img0", "fallback1", "img2"])
+        mock_convert.assert_called_once_with(
+            "/path/to/file.pdf", dpi=200, first_page=2, last_page=2
+        )
+        bad_page.close.assert_called_once()
+
+    @patch("app.pdf.print_exc")
+    @patch("app.pdf.cp")
+    @patch("app.pdf.convert_from_path", side_effect=OSError("no poppler"))
+    @patch("app.pdf.PdfDocument")
+    def test_unrenderable_page_yields_none(
+        self, mock_doc_cls, mock_convert, mock_cp, mock_print_exc
+    ):
+        from app.pdf import _pdf_to_img
+
+        doc = mock_doc_cls.return_value
+        doc.__len__.return_value = 1
+        doc.get_page.return_value.render.side_effect = RuntimeError("bad page")
+        self.assertEqual(list(_pdf_to_img("/path/to/file.pdf")), [None])
+
+    @patch("app.pdf.print_exc")
+    @patch("app.pdf.cp")
+    @patch("app.pdf.convert_from_path", return_value=["fallback1", "fallback2"])
+    @patch("app.pdf.PdfDocument", side_effect=RuntimeError("cannot open"))
+    def test_unopenable_pdf_falls_back_to_pdf2image(
+        self, mock_doc_cls, mock_convert, mock_cp, mock_print_exc
+    ):
+        from app.pdf import _pdf_to_img
+
+        pages = list(_pdf_to_img("/path/to/file.pdf"))
+        self.assertEqual(pages, ["fallback1", "fallback2"])
+        mock_convert.assert_called_once_with("/path/to/file.pdf", dpi=200)
+
+
+class TestCreateChildPdf(unittest.TestCase):
+    """Test splitting selected pages into a child PDF."""
+
+    def test_pages_written_in_document_order(self):
+        from pypdf import PdfReader, PdfWriter
+        from app.pdf import create_child_pdf
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            src = os.path.join(tmpdir, "src.pdf")
+            dst = os.path.join(tmpdir, "child.pdf")
+            writer = PdfWriter()
+            for width in (100, 200, 300, 400):
+                writer.add_blank_page(width, 500)
+            with open(src, "wb") as f:
+                writer.write(f)
+
+            create_child_pdf(src, {3, 0, 2}, dst)
+
+            widths = [int(page.mediabox.width) for page in PdfReader(dst).pages]
+            self.assertEqual(widths, [100, 300, 400])
+
+
+class TestPdfHandle(unittest.TestCase):
+    """Test the shared PDF handle."""
+
+    def setUp(self):
+        from pypdf import PdfWriter
+
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmpdir.name, "doc.pdf")
+        writer = PdfWriter()
+        writer.add_blank_page(612, 792)
+        with open(self.path, "wb") as f:
+            writer.write(f)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_document_reuses_reader_bytes(self):
+        from app.pdf import PdfHandle
+
+        with open(self.path, "rb") as f:
+            data = f.read()
+        with PdfHandle(self.path) as handle:
+            self.assertEqual(len(handle.reader.pages), 1)
+            with patch("app.pdf.PdfDocument") as mock_doc_cls:
+                handle.document
+            mock_doc_cls.assert_called_once_with(data)
+
+    def test_document_opened_from_path_without_reader(self):
+        from app.pdf import PdfHandle
+
+        handle = PdfHandle(self.path)
+        self.assertEqual(len(handle.document), 1)
+        handle.close()
+        self.assertIsNone(handle._document)
+
 
 class TestOpenWithDebug(unittest.TestCase):
     """Test the open_with_debug function."""
@@ -0,0 +1,374 @@
+import io
+import threading
+import unittest
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import pytest
+
+pytest.importorskip("fitz")  # app.po_validator imports PyMuPDF
+
+from app.po_validator import extractor  # noqa: E402
+from app.po_validator.extractor import _PageTable, _PageText  # noqa: E402
+from app.po_validator.models import POExtraction, POLineItem  # noqa: E402
+
+
+class TestFindPoNumber(unittest.TestCase):
+    def test_formats(self):
+        cases = {
+            "Purchase Order#20260105016PO": "20260105016PO",
+            "Purchase Order No: 53105": "53105",
+            "Purchase Order 10496\nDate": "10496",
+            "PO Number: 160003": "160003",
+            "PO No: TE022442": "TE022442",
+            "Customer PO: 20260202019PO": "20260202019PO",
+            "Invoice #: 56561-084498": "56561-084498",
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(extractor._find_po_number(text), expected)
+
+    def test_false_positive_skipped(self):
+        text = "PO# Date\nCustomer PO: 53057"
+        self.assertEqual(extractor._find_po_number(text), "53057")
+
+    def test_not_found(self):
+        self.assertEqual(extractor._find_po_number("Quote 123"), "")
+
+
+class TestHeaders(unittest.TestCase):
+    def test_desc_column_priority(self):
+        headers = ["Line Item", "Item No", "Service", "Description", "Price"]
+        self.assertEqual(extractor._find_desc_column_index(headers), 3)
+        self.assertEqual(extractor._find_desc_column_index(headers[:3]), 2)
+        self.assertEqual(extractor._find_desc_column_index(["Line\nItem", "Item"]), 1)
+        self.assertIsNone(extractor._find_desc_column_index(["Line Item", "Qty"]))
+
+    def test_classify_headers_reports_every_kind(self):
+        kinds = extractor._classify_headers(
+            ["Item No", "Serial #", "Item Price", "Qty", "Ext. Price"]
+        )
+        self.assertEqual(kinds, {"sn": [1], "item": [2], "price": [2, 4], "qty": [3]})
+
+    def test_header_row_found_below_title(self):
+        table = [
+            ["ACME Corp", None, None],
+            ["Serial #", "Description", "Unit Price"],
+            ["A1", "Gauge", "$10.00"],
+        ]
+        self.assertEqual(extractor._find_header_row(table), 1)
+
+
+class TestExtractPages(unittest.TestCase):
+    def _pages(self):
+        tbl = MagicMock(bbox=[1, 2, 3, 4], rows=[MagicMock(bbox=[1, 2, 3, 4])])
+        tbl.extract.return_value = [["S/N", "Price"], ["A1", "$5"]]
+        empty = MagicMock()
+        empty.extract.return_value = []
+        first, second = MagicMock(), MagicMock()
+        first.extract_text.return_value = "PO Number: 1"
+        first.find_tables.return_value = [empty]
+        second.extract_text.return_value = None
+        second.find_tables.return_value = [tbl]
+        return first, second
+
+    def test_text_from_every_page(self):
+        first, second = self._pages()
+        raw_text, page_texts = extractor._extract_text_from_pages(
+            MagicMock(pages=[first, second])
+        )
+        self.assertEqual(raw_text, "PO Number: 1")
+        self.assertEqual([pt.page_index for pt in page_texts], [0])
+
+    def test_tables_detected_lazily(self):
+        first, second = self._pages()
+        tables = extractor._iter_tables_from_pages(MagicMock(pages=[first, second]))
+        second.find_tables.assert_not_called()
+
+        tables = list(tables)
+        self.assertEqual(len(tables), 1)
+        self.assertEqual(tables[0].page_index, 1)
+        self.assertEqual(tables[0].table_bbox, (1, 2, 3, 4))
+        self.assertEqual(tables[0].row_bboxes, [(1, 2, 3, 4)])
+        first.close.assert_called_once()
+        second.close.assert_called_once()
+
+    @patch.object(extractor, "_parse_table")
+    def test_best_table_stops_at_full_confidence(self, mock_parse):
+        results = {"a": (["a"], 0.5), "b": (["b"], 1.0), "c": (["c"], 1.0)}
+        mock_parse.side_effect = results.get
+        seen = []
+
+        def tables():
+            for name in "abc":
+                seen.append(name)
+                yield name
+
+        self.assertEqual(extractor._best_table(tables()), (["b"], 1.0))
+        self.assertEqual(seen, ["a", "b"])
+
+
+class TestParseTable(unittest.TestCase):
+    def test_rows_parsed_with_bboxes(self):
+        data = [
+            ["Qty", "S/N", "Description", "Unit Price", "Ext Price"],
+            ["1", "SN-1", "Torque\nwrench", "$1,200.50", "$1,200.50"],
+            ["2", None, "Caliper SN: X9912", "$50.00", "$100.00"],
+            [None, None, "Subtotal", None, "$1,300.50"],
+        ]
+        row_bboxes = [(50.0, top, 350.0, top + 18) for top in (100.0, 120.0, 140.0)]
+        table = _PageTable(2, (50, 100, 350, 178), row_bboxes, data)
+        items, confidence = extractor._parse_table(table)
+
+        self.assertEqual(len(items), 2)
+        first, second = items
+        self.assertEqual(first.serial_number, "SN-1")
+        self.assertEqual(first.description, "Torque wrench")
+        self.assertEqual((first.unit_price, first.quantity), (1200.5, 1))
+        self.assertEqual(first.page_number, 2)
+        self.assertEqual(first.bbox, (50.0, 120.0, 350.0, 138.0))
+        self.assertEqual(second.serial_number, "X9912")
+        self.assertEqual(second.extended_price, 100.0)
+        self.assertEqual(confidence, 1.0)
+        model = first.to_model()
+        self.assertIsInstance(model, POLineItem)
+        self.assertEqual(model.bbox, first.bbox)
+
+    def test_rejected_table_never_computes_row_bboxes(self):
+        tbl = MagicMock()
+        type(tbl).rows = PropertyMock(side_effect=AssertionError("rows computed"))
+        table = _PageTable.from_pdfplumber(0, tbl, [["Qty", "Notes"], ["1", "x"]])
+        self.assertEqual(extractor._parse_table(table), ([], 0.0))
+
+    def test_table_without_price_or_serial_rejected(self):
+        table = _PageTable(0, (0, 0, 1, 1), [], [["Qty", "Notes"], ["1", "x"]])
+        self.assertEqual(extractor._parse_table(table), ([], 0.0))
+
+
+class TestEnrichItemsWithTextSns(unittest.TestCase):
+    def test_unassigned_non_ip_serials_fill_gaps_in_order(self):
+        items = [
+            extractor._RawLineItem(None, "", 1.0, 1, None, 0, None),
+            extractor._RawLineItem("BB2", "", 1.0, 1, None, 0, None),
+            extractor._RawLineItem(None, "", 1.0, 1, None, 0, None),
+        ]
+        extractor._enrich_items_with_text_sns(
+            items, "S/N 10.0.0.1\nS/N BB2\nSerial No: CC3"
+        )
+        self.assertEqual([it.serial_number for it in items], ["CC3", "BB2", None])
+
+
+class TestParseTextLines(unittest.TestCase):
+    def test_price_lines_become_items(self):
+        text = "\n".join(
+            [
+                "Calibrate gauge  $100.00  $200.00",
+                "S/N ABC123",
+                "Subtotal $200.00",
+            ]
+        )
+        items = extractor._parse_text_lines([_PageText(1, text)])
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0].serial_number, "ABC123")
+        self.assertEqual((items[0].unit_price, items[0].extended_price), (100.0, 200.0))
+        self.assertEqual(items[0].page_number, 1)
+
+    def test_description_continuation_stops_at_price_or_skip_line(self):
+        text = "\n".join(
+            [
+                "Calibrate gauge  $100.00",
+                "Range 0-1in",
+                "Tax",
+                "Torque wrench  $50.00",
+                "Shipping $10.00",
+            ]
+        )
+        items = extractor._parse_text_lines([_PageText(0, text)])
+        self.assertEqual(
+            [item.description for item in items],
+            ["Calibrate gauge | Range 0-1in", "Torque wrench"],
+        )
+
+
+class TestPagesToImageBytes(unittest.TestCase):
+    def test_pages_encoded_as_jpeg_in_order(self):
+        from PIL import Image
+
+        pages = []
+        for shade in (0, 128, 255):
+            page = MagicMock()
+            page.to_image.return_value.original = Image.new(
+                "RGB", (20, 10), (shade,) * 3
+            )
+            pages.append(page)
+        images = extractor._pdf_pages_to_image_bytes(MagicMock(pages=pages))
+
+        self.assertEqual(len(images), 3)
+        for data, shade in zip(images, (0, 128, 255)):
+            img = Image.open(io.BytesIO(data))
+            self.assertEqual(img.format, "JPEG")
+            self.assertAlmostEqual(img.getpixel((5, 5))[0], shade, delta=2)
+        pages[0].to_image.assert_called_once_with(resolution=200)
+
+    def test_non_rgb_pages_are_converted(self):
+        from PIL import Image
+
+        for mode in ("RGBA", "P", "LA"):
+            data = extractor._encode_page_image(Image.new(mode, (20, 10)))
+            img = Image.open(io.BytesIO(data))
+            self.assertEqual((img.format, img.mode), ("JPEG", "RGB"))
+
+    def test_waits_for_shared_pdfium_lock(self):
+        from PIL import Image
+
+        page = MagicMock()
+        page.to_image.return_value.original = Image.new("RGB", (20, 10))
+        worker = threading.Thread(
+            target=extractor._pdf_pages_to_image_bytes,
+            args=(MagicMock(pages=[page]),),
+        )
+        with extractor.pdfium_lock:
+            worker.start()
+            worker.join(timeout=0.1)
+            page.to_image.assert_not_called()
+        worker.join()
+        page.to_image.assert_called_once()
+
+
+class TestTier1Cache(unittest.TestCase):
+    def setUp(self):
+        extractor._tier1_cache.clear()
+
+    def tearDown(self):
+        extractor._tier1_cache.clear()
+
+    @patch.object(extractor, "_extract_with_pdfplumber")
+    def test_same_bytes_parsed_once(self, mock_extract):
+        mock_extract.return_value = POExtraction(
+            line_items=[POLineItem(serial_number="A1")], confidence=1.0
+        )
+        first = extractor.extract_with_pdfplumber(b"%PDF-1")
+        first.line_items[0].serial_number = "changed"
+        second = extractor.extract_with_pdfplumber(b"%PDF-1")
+
+        mock_extract.assert_called_once()
+        self.assertEqual(second.line_items[0].serial_number, "A1")
+        extractor.extract_with_pdfplumber(b"%PDF-2")
+        self.assertEqual(mock_extract.call_count, 2)
+
+    @patch.object(extractor, "_extract_with_pdfplumber", return_value=None)
+    def test_failures_not_cached(self, mock_extract):
+        extractor.extract_with_pdfplumber(b"%PDF-1")
+        extractor.extract_with_pdfplumber(b"%PDF-1")
+        self.assertEqual(mock_extract.call_count, 2)
+
+    @patch.object(extractor, "_TIER1_CACHE_MAX_BYTES", 4)
+    @patch.object(extractor, "_extract_with_pdfplumber")
+    def test_large_pdfs_not_cached(self, mock_extract):
+        extractor.extract_with_pdfplumber(b"%PDF-1")
+        extractor.extract_with_pdfplumber(b"%PDF-1")
+        self.assertEqual(mock_extract.call_count, 2)
+        self.assertEqual(len(extractor._tier1_cache), 0)
+
+
+class TestExtractPoData(unittest.TestCase):
+    @patch.object(extractor, "extract_with_llm")
+    @patch.object(extractor, "extract_with_pdfplumber")
+    @patch.object(extractor, "open_pdf")
+    def test_tiers_share_one_open_pdf(self, mock_open_pdf, mock_tier1, mock_llm):
+        mock_tier1.return_value = POExtraction(confidence=0.1, raw_text="PO 1")
+        mock_llm.return_value = POExtraction(
+            line_items=[POLineItem(serial_number="A1")], extraction_method="llm"
+        )
+        result = extractor.extract_po_data(b"%PDF")
+
+        handle = mock_open_pdf.return_value
+        mock_open_pdf.assert_called_once_with(b"%PDF")
+        mock_tier1.assert_called_once_with(b"%PDF", pdf=handle)
+        mock_llm.assert_called_once_with(b"%PDF", pdf=handle, rendered=None)
+        handle.__exit__.assert_called_once()
+        self.assertEqual(result.extraction_method, "llm")
+        self.assertEqual(result.raw_text, "PO 1")
+
+    @patch.object(extractor, "extract_with_llm")
+    @patch.object(extractor, "open_pdf")
+    def test_caller_handle_left_open(self, mock_open_pdf, mock_llm):
+        mock_llm.return_value = None
+        handle = MagicMock()
+        extractor.extract_po_data(b"%PDF", table_result=None, pdf=handle)
+        mock_open_pdf.assert_not_called()
+        mock_llm.assert_called_once_with(b"%PDF", pdf=handle, rendered=None)
+        handle.close.assert_not_called()
+        handle.__exit__.assert_not_called()
+
+
+class TestStripCodeFence(unittest.TestCase):
+    def test_fences_removed(self):
+        cases = {
+            '```json\n{"a": 1}\n```': '{"a": 1}',
+            '```\n{"a": 1}```': '{"a": 1}',
+            '  {"a": 1}\n': '{"a": 1}',
+            "```": "",
+        }
+        for raw, expected in cases.items():
+            with self.subTest(raw=raw):
+                self.assertEqual(extractor._strip_code_fence(raw), expected)
+
+
+@patch.object(extractor, "SPECULATIVE_RENDER", True)
+@patch.dict("os.environ", {"GEMINI_API_KEY": "test-key"})
+class TestSpeculativeRender(unittest.TestCase):
+    @patch.object(extractor, "extract_with_llm")
+    @patch.object(extractor, "extract_with_pdfplumber")
+    @patch.object(extractor, "open_pdf")
+    @patch.object(extractor, "start_speculative_render")
+    def test_render_cancelled_when_tier1_succeeds(
+        self, mock_start, mock_open_pdf, mock_tier1, mock_llm
+    ):
+        mock_tier1.return_value = POExtraction(confidence=1.0)
+        extractor.extract_po_data(b"%PDF")
+        mock_start.assert_called_once_with(b"%PDF")
+        mock_start.return_value.cancel.assert_called_once()
+        mock_llm.assert_not_called()
+
+    @patch.object(extractor, "_render_page_images", return_value=[b"jpeg"])
+    @patch.object(extractor, "GenAIClient")
+    def test_tier2_uses_speculative_images(self, mock_client, mock_render):
+        mock_client.return_value.models.generate_content.return_value.text = (
+            '{"po_number": "1", "line_items": []}'
+        )
+        rendered = extractor.start_speculative_render(b"%PDF")
+        with patch.object(extractor, "_pdf_pages_to_image_bytes") as mock_pages:
+            result = extractor.extract_with_llm(b"%PDF", rendered=rendered)
+        mock_pages.assert_not_called()
+        mock_render.assert_called_once_with(b"%PDF")
+        self.assertEqual(result.po_number, "1")
+
+    @patch.object(extractor.pdfplumber, "open")
+    def test_background_render_takes_pdfium_lock(self, mock_open):
+        from PIL import Image
+
+        page = MagicMock()
+        page.to_image.return_value.original = Image.new("RGB", (20, 10))
+        mock_open.return_value.__enter__.return_value.pages = [page]
+        with extractor.pdfium_lock:
+            rendered = extractor.start_speculative_render(b"%PDF")
+            with self.assertRaises(TimeoutError):
+                rendered.result(timeout=0.1)
+            page.to_image.assert_not_called()
+        self.assertEqual(len(rendered.result(timeout=5)), 1)
+
+    def test_disabled_without_api_key(self):
+        with patch.dict("os.environ", {"GEMINI_API_KEY": ""}):
+            self.assertIsNone(extractor.start_speculative_render(b"%PDF"))
+
+
+class TestCleanPrice(unittest.TestCase):
+    def test_values(self):
+        self.assertEqual(extractor._clean_price("$1,234.56"), 1234.56)
+        self.assertEqual(extractor._clean_price("-$5"), -5.0)
+        self.assertIsNone(extractor._clean_price("n/a"))
+        self.assertIsNone(extractor._clean_price(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,524 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import Future
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+pytest.importorskip("fitz")  # app.po_validator imports PyMuPDF
+
+# Bind the real package now: test_upload.py replaces sys.modules entry with a
+# MagicMock at collection time, so string-based patch targets would miss it.
+import app.po_validator as po_validator  # noqa: E402
+from app.po_validator import _SnIndex, _sn_keys, annotator, reporter  # noqa: E402
+from app.po_validator.models import (  # noqa: E402
+    LineAnnotation,
+    MissingWorkItem,
+    POExtraction,
+    POLineItem,
+    PriceMismatch,
+    ValidationResult,
+)
+
+
+def _wi(work_item_id, serial_number, price, asset_name=""):
+    return SimpleNamespace(
+        work_item_id=work_item_id,
+        serial_number=serial_number,
+        asset_name=asset_name,
+        service_charge=price,
+        service_total=price,
+    )
+
+
+def _po(serial_number, price, description=""):
+    return POLineItem(
+        serial_number=serial_number, unit_price=price, description=description
+    )
+
+
+class TestSnIndex(unittest.TestCase):
+    def _match(self, a, b):
+        return _SnIndex([_sn_keys(b)]).matches(_sn_keys(a)) == {0}
+
+    def test_ignores_case_dashes_and_spaces(self):
+        self.assertTrue(self._match("ab-12 34", "AB1234"))
+
+    def test_ignores_leading_zeros(self):
+        self.assertTrue(self._match("000123", "123"))
+
+    def test_partial_match_needs_four_characters(self):
+        self.assertTrue(self._match("XJ12345", "12345"))
+        self.assertFalse(self._match("X123", "123"))
+
+    def test_different_serials(self):
+        self.assertFalse(self._match("ABC123", "XYZ789"))
+
+    def test_exact_hits_skip_the_partial_sweep(self):
+        index = _SnIndex([_sn_keys("12345"), _sn_keys("XJ12345"), None])
+        self.assertEqual(index.matches(_sn_keys("0012345")), {0})
+        self.assertEqual(index.matches(_sn_keys("2345")), {0, 1})
+
+
+@patch.object(po_validator, "_quick_skip_check", return_value=False)
+class TestValidate(unittest.TestCase):
+    def _validate(self, work_items, line_items, raw_text=""):
+        extraction = POExtraction(
+            po_number="PO-1",
+            line_items=line_items,
+            extraction_method="table",
+            raw_text=raw_text,
+        )
+        with patch.object(po_validator, "extract_po_data", return_value=extraction):
+            return po_validator.validate(b"%PDF", 1, work_items, "PO_1.pdf")
+
+    def test_all_prices_match(self, _):
+        result = self._validate(
+            [_wi(1, "SN-001", 100.0), _wi(2, "SN-002", 50.0)],
+            [_po("SN002", 50.0), _po("sn001", 100.0)],
+        )
+        self.assertEqual(result.status, "pass")
+        self.assertEqual(result.line_items_matched, 2)
+
+    def test_price_mismatch(self, _):
+        result = self._validate([_wi(1, "A1234", 100.0)], [_po("A1234", 90.0)])
+        self.assertEqual(result.status, "fail")
+        self.assertEqual(result.mismatches[0].difference, -10.0)
+
+    def test_duplicate_serials_pair_by_closest_price(self, _):
+        result = self._validate(
+            [_wi(1, "DUP1", 100.0), _wi(2, "DUP1", 200.0)],
+            [_po("DUP1", 200.0), _po("DUP1", 100.0)],
+        )
+        self.assertEqual(result.status, "pass")
+        self.assertEqual(result.line_items_matched, 2)
+
+    def test_exact_serial_preferred_over_partial_match(self, _):
+        result = self._validate(
+            [_wi(1, "12345", 100.0)],
+            [_po("X12345", 100.0), _po("12345", 90.0)],
+        )
+        self.assertEqual(result.status, "fail")
+        self.assertEqual(result.mismatches[0].po_price, 90.0)
+
+    def test_unique_exact_matches_skip_ranking(self, _):
+        with patch.object(po_validator.np, "argsort") as mock_argsort:
+            result = self._validate(
+                [_wi(1, "SN-001", 100.0), _wi(2, "SN-002", 50.0)],
+                [_po("SN002", 50.0), _po("sn001", 100.0)],
+            )
+        self.assertEqual(result.status, "pass")
+        self.assertEqual(result.line_items_matched, 2)
+        mock_argsort.assert_not_called()
+
+    def test_partial_serial_match(self, _):
+        result = self._validate([_wi(1, "12345", 100.0)], [_po("X12345", 100.0)])
+        self.assertEqual(result.status, "pass")
+
+    def test_missing_work_item(self, _):
+        result = self._validate(
+            [_wi(1, "AAAA1", 100.0), _wi(2, "BBBB2", 50.0)],
+            [_po("AAAA1", 100.0)],
+        )
+        self.assertEqual(result.status, "fail")
+        self.assertEqual([m.work_item_id for m in result.missing_items], [2])
+
+    def test_text_fallback_match(self, _):
+        result = self._validate(
+            [_wi(1, "Q-77 (old)", 75.0)],
+            [_po(None, 75.0, description="Calibrate gauge Q-77")],
+        )
+        self.assertEqual(result.status, "pass")
+        self.assertEqual(result.line_items_checked, 1)
+
+    def test_text_fallback_matches_asset_name_case_insensitively(self, _):
+        result = self._validate(
+            [_wi(1, "ZZ-9", 40.0, asset_name="Torque Wrench")],
+            [_po(None, 40.0, description="misc")],
+            raw_text="Calibrate TORQUE WRENCH per spec",
+        )
+        self.assertEqual(result.status, "pass")
+
+    def test_no_pricing(self, _):
+        result = self._validate([_wi(1, "A1", 10.0)], [_po("A1", None)])
+        self.assertEqual(result.status, "no_pricing")
+
+
+def _opened(doc):
+    opened = MagicMock()
+    opened.__enter__.return_value = doc
+    return opened
+
+
+class TestQuickSkipCheck(unittest.TestCase):
+    @patch.object(po_validator, "fitz")
+    def test_mupdf_text_matched(self, mock_fitz):
+        doc = MagicMock(page_count=1)
+        doc[0].get_text.return_value = "Request for PO\nOrder   Price\nUpdate"
+        mock_fitz.open.return_value = _opened(doc)
+        with patch.object(po_validator.pdfplumber, "open") as mock_plumber:
+            self.assertTrue(po_validator._quick_skip_check(b"%PDF"))
+        mock_plumber.assert_not_called()
+
+    @patch.object(po_validator, "fitz")
+    def test_customer_po_not_skipped(self, mock_fitz):
+        doc = MagicMock(page_count=1)
+        doc[0].get_text.return_value = "Purchase Order\nRequest for PO"
+        mock_fitz.open.return_value = _opened(doc)
+        self.assertFalse(po_validator._quick_skip_check(b"%PDF"))
+
+    @patch.object(po_validator, "fitz")
+    def test_falls_back_to_pdfplumber(self, mock_fitz):
+        mock_fitz.open.side_effect = RuntimeError("cannot open")
+        pdf = MagicMock()
+        pdf.pages[0].extract_text.return_value = "ORDER PRICE UPDATE REQUEST FOR PO"
+        with patch.object(po_validator.pdfplumber, "open", return_value=_opened(pdf)):
+            self.assertTrue(po_validator._quick_skip_check(b"%PDF"))
+
+    @patch.object(po_validator, "fitz")
+    def test_unreadable_pdf_not_skipped(self, mock_fitz):
+        mock_fitz.open.side_effect = RuntimeError("cannot open")
+        with patch.object(
+            po_validator.pdfplumber, "open", side_effect=Exception("bad pdf")
+        ):
+            self.assertFalse(po_validator._quick_skip_check(b"%PDF"))
+
+
+@patch.object(po_validator.fitz, "open", side_effect=RuntimeError("no MuPDF"))
+class TestValidateQuickCheck(unittest.TestCase):
+    def _open_with_text(self, text):
+        pdf = MagicMock()
+        pdf.pages[0].extract_text.return_value = text
+        return _opened(pdf)
+
+    @patch.object(po_validator, "open_pdf")
+    @patch.object(po_validator, "extract_po_data")
+    @patch.object(po_validator, "extract_with_pdfplumber", return_value=None)
+    def test_price_update_request_skipped(
+        self, mock_tier1, mock_extract, mock_open_pdf, _
+    ):
+        opened = self._open_with_text("Order Price Update\nRequest for PO")
+        with patch.object(po_validator.pdfplumber, "open", return_value=opened):
+            result = po_validator.validate(b"%PDF", 1, [_wi(1, "A1", 10.0)])
+        self.assertEqual(result.status, "skipped")
+        mock_extract.assert_not_called()
+
+    def test_uncollected_tier1_handle_closed(self, _):
+        pdf = MagicMock()
+        future = Future()
+        future.set_result((pdf, None))
+        po_validator._close_tier1_pdf(future)
+        pdf.close.assert_called_once()
+
+        cancelled = Future()
+        cancelled.cancel()
+        po_validator._close_tier1_pdf(cancelled)  # nothing to close
+
+    @patch.object(po_validator, "open_pdf")
+    @patch.object(po_validator, "extract_po_data")
+    @patch.object(po_validator, "extract_with_pdfplumber")
+    def test_background_tier1_result_reused(
+        self, mock_tier1, mock_extract, mock_open_pdf, _
+    ):
+        mock_extract.return_value = POExtraction(
+            po_number="PO-1", line_items=[_po("A1", 10.0)]
+        )
+        opened = self._open_with_text("Purchase Order")
+        with patch.object(po_validator.pdfplumber, "open", return_value=opened):
+            result = po_validator.validate(b"%PDF", 1, [_wi(1, "A1", 10.0)])
+        self.assertEqual(result.status, "pass")
+        shared = mock_open_pdf.return_value
+        mock_tier1.assert_called_once_with(b"%PDF", pdf=shared)
+        mock_extract.assert_called_once_with(
+            b"%PDF", table_result=mock_tier1.return_value, pdf=shared, rendered=None
+        )
+        shared.close.assert_called_once()
+
+
+class TestValidateAndAnnotate(unittest.TestCase):
+    @patch.object(po_validator, "print_result")
+    @patch.object(
+        po_validator, "annotate_pdf", return_value=(b"out", "PO_1_APPROVED.pdf")
+    )
+    @patch.object(po_validator, "validate")
+    @patch.object(po_validator, "fitz")
+    def test_document_opened_once_and_shared(
+        self, mock_fitz, mock_validate, mock_annotate, _
+    ):
+        doc = mock_fitz.open.return_value
+        mock_validate.return_value = SimpleNamespace(status="pass")
+
+        out, name, _ = po_validator.validate_and_annotate(b"%PDF", 1, [], "PO_1.pdf")
+
+        self.assertEqual((out, name), (b"out", "PO_1_APPROVED.pdf"))
+        mock_fitz.open.assert_called_once_with(stream=b"%PDF", filetype="pdf")
+        self.assertIs(mock_validate.call_args.kwargs["fitz_doc"], doc)
+        self.assertIs(mock_annotate.call_args.kwargs["doc"], doc)
+        doc.close.assert_called_once()
+
+
+class TestFindTextPosition(unittest.TestCase):
+    WORDS = [
+        (50.0, 100.0, 80.0, 110.0, "Calibrate", 0, 0, 0),
+        (82.0, 100.0, 120.0, 110.0, "Gauge", 0, 0, 1),
+        (50.0, 200.0, 80.0, 210.0, "Calibrate", 1, 0, 0),
+        (82.0, 200.0, 120.0, 210.0, "gauge", 1, 0, 1),
+    ]
+
+    def setUp(self):
+        self.page = MagicMock()
+        self.page.get_text.return_value = self.WORDS
+
+    def test_duplicates_land_on_successive_rows(self):
+        used = set()
+        lines = annotator._page_lines(self.page)
+        find = annotator._find_text_position
+        self.assertEqual(
+            find(self.page, "calibrate  GAUGE", used, 0, lines), (50.0, 105.0)
+        )
+        self.assertEqual(
+            find(self.page, "Calibrate Gauge", used, 0, lines), (50.0, 205.0)
+        )
+        self.assertIsNone(find(self.page, "Calibrate Gauge", used, 0, lines))
+        self.page.get_text.assert_called_once_with("words")
+        self.page.search_for.assert_not_called()
+
+    def test_match_inside_line_uses_starting_word(self):
+        pos = annotator._find_text_position(self.page, "gauge")
+        self.assertEqual(pos, (82.0, 105.0))
+
+    def test_falls_back_to_search_for(self):
+        self.page.search_for.return_value = [
+            SimpleNamespace(x0=10.0, y0=300.0, y1=310.0)
+        ]
+        pos = annotator._find_text_position(self.page, "Calibrate Gauge Block")
+        self.assertEqual(pos, (10.0, 305.0))
+
+    def test_whitespace_only_text_not_placed(self):
+        self.assertIsNone(annotator._find_text_position(self.page, "  \n "))
+        self.page.search_for.assert_not_called()
+
+
+class TestAnnotatePdf(unittest.TestCase):
+    def setUp(self):
+        annotator._helv_text_length.cache_clear()
+        self.addCleanup(annotator._helv_text_length.cache_clear)
+
+    @patch.object(annotator, "_stamp_pixmap", return_value=None)
+    @patch.object(annotator, "fitz")
+    def test_one_shape_commit_per_page(self, mock_fitz, _):
+        mock_fitz.get_text_length.return_value = 50.0
+        doc = MagicMock()
+        doc.__len__.return_value = 1
+        page = doc.__getitem__.return_value
+        shape = page.new_shape.return_value
+        result = ValidationResult(
+            document_name="PO_1.pdf",
+            service_order_id=1,
+            status="fail",
+            annotations=[
+                LineAnnotation(status="ok", bbox=(100, 100, 200, 110)),
+                LineAnnotation(
+                    status="mismatch",
+                    comment="Expected $1.00",
+                    bbox=(100, 120, 200, 130),
+                ),
+            ],
+        )
+
+        _, name = annotator.annotate_pdf(b"%PDF", result, doc=doc)
+
+        self.assertEqual(name, "PO_1_REJECTED.pdf")
+        page.new_shape.assert_called_once()
+        shape.commit.assert_called_once()
+        self.assertEqual(shape.draw_line.call_count, 4)
+        shape.draw_rect.assert_called_once()
+        shape.insert_text.assert_called_once()
+        page.insert_text.assert_not_called()
+        doc.close.assert_not_called()
+
+    @patch.object(annotator, "_stamp_pixmap", return_value=None)
+    @patch.object(annotator, "fitz")
+    def test_missing_item_widths_measured_once(self, mock_fitz, _):
+        mock_fitz.get_text_length.return_value = 100.0
+        doc = MagicMock()
+        doc.__getitem__.return_value.rect = MagicMock(width=612, height=792)
+        result = ValidationResult(
+            document_name="PO_1.pdf",
+            service_order_id=1,
+            status="fail",
+            missing_items=[
+                MissingWorkItem(work_item_id=1, serial_number="A1", asset_name="Gauge")
+            ],
+        )
+
+        annotator.annotate_pdf(b"%PDF", result, doc=doc)
+        annotator.annotate_pdf(b"%PDF", result, doc=doc)
+
+        self.assertEqual(mock_fitz.get_text_length.call_count, 2)  # header + item
+
+
+class TestStampPixmap(unittest.TestCase):
+    def setUp(self):
+        annotator._stamp_pixmap.cache_clear()
+        self.addCleanup(annotator._stamp_pixmap.cache_clear)
+
+    @patch.object(annotator, "fitz")
+    def test_decoded_once_per_outcome(self, mock_fitz):
+        mock_fitz.Pixmap.return_value = MagicMock(width=300, height=200)
+        first = annotator._stamp_pixmap("APPROVED")
+        second = annotator._stamp_pixmap("APPROVED")
+        self.assertIs(first, second)
+        self.assertEqual(first[1:], (300, 200))
+        mock_fitz.Pixmap.assert_called_once_with(
+            str(annotator._STAMP_FILES["APPROVED"])
+        )
+
+    def test_unknown_outcome(self):
+        self.assertIsNone(annotator._stamp_pixmap("UNKNOWN"))
+
+
+class TestPrintResult(unittest.TestCase):
+    def test_result_written_in_one_call(self):
+        result = ValidationResult(
+            document_name="a.pdf",
+            status="fail",
+            missing_items=[MissingWorkItem(work_item_id=1, serial_number="SN2")],
+            notes="check",
+        )
+        with patch.object(reporter.sys, "stdout") as mock_stdout:
+            reporter.print_result(result)
+        mock_stdout.write.assert_called_once()
+        text = mock_stdout.write.call_args.args[0]
+        self.assertTrue(text.startswith("[FAIL] a.pdf"))
+        self.assertIn("  MISSING   S/N SN2:", text)
+        self.assertTrue(text.endswith("  Note: check\n\n"))
+
+    def test_quiet_mode_skips_passing_results(self):
+        with patch.object(reporter, "VERBOSE", False), patch.object(
+            reporter.sys, "stdout"
+        ) as mock_stdout:
+            reporter.print_result(ValidationResult(status="pass"))
+            mock_stdout.write.assert_not_called()
+            reporter.print_result(ValidationResult(status="fail"))
+            mock_stdout.write.assert_called_once()
+
+class TestPrintSummary(unittest.TestCase):
+    def test_counts_by_status(self):
+        results = [
+            ValidationResult(status=s)
+            for s in ("pass", "pass", "fail", "no_pricing", "skipped")
+        ]
+        with patch.object(reporter.sys, "stdout") as mock_stdout:
+            reporter.print_summary(results)
+        self.assertIn(
+            "SUMMARY: 5 POs checked — 2 passed, 1 FAILED, "
+            "1 no pricing, 0 extraction errors",
+            mock_stdout.write.call_args.args[0],
+        )
+
+class TestJsonReport(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def _result(self, name, status="pass"):
+        return ValidationResult(document_name=name, status=status)
+
+    def test_appends_one_line_per_result(self):
+        reporter.save_json_report([self._result("a.pdf")], self.path)
+        reporter.save_json_report(
+            [self._result("b.pdf"), self._result("c.pdf", "fail")], self.path
+        )
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 3)
+        rows = list(reporter.load_json_report(self.path))
+        self.assertEqual(
+            [r["document_name"] for r in rows], ["a.pdf", "b.pdf", "c.pdf"]
+        )
+        self.assertEqual(rows[2]["status"], "fail")
+        self.assertIsInstance(rows[0]["timestamp"], str)
+
+    def test_round_trips_through_model(self):
+        original = self._result("a.pdf")
+        reporter.save_json_report([original], self.path)
+        (row,) = reporter.load_json_report(self.path)
+        self.assertEqual(ValidationResult.model_validate(row), original)
+
+    def test_legacy_array_report_is_migrated(self):
+        legacy = [self._result("old.pdf").model_dump(mode="json")]
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(legacy, f, indent=2)
+        reporter.save_json_report([self._result("new.pdf")], self.path)
+        rows = list(reporter.load_json_report(self.path))
+        self.assertEqual([r["document_name"] for r in rows], ["old.pdf", "new.pdf"])
+
+    def test_unreadable_legacy_report_is_left_alone(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('[{"document_name": ')
+        with self.assertRaises(json.JSONDecodeError):
+            reporter.save_json_report([self._result("new.pdf")], self.path)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), '[{"document_name": ')
+
+
+class TestCsvReport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "report.csv")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _rows(self):
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
+    def test_header_written_once_across_batches(self):
+        result = ValidationResult(document_name="a.pdf", status="pass")
+        reporter.save_csv_report([result], self.path)
+        reporter.save_csv_report([result, result], self.path)
+        rows = self._rows()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["document_name"], "a.pdf")
+
+    def test_mismatch_and_missing_columns(self):
+        result = ValidationResult(
+            document_name="a.pdf",
+            status="fail",
+            confidence=0.875,
+            mismatches=[
+                PriceMismatch(
+                    serial_number="SN1", po_price=10, expected_price=12, difference=-2
+                )
+            ],
+            missing_items=[
+                MissingWorkItem(work_item_id=1, serial_number="SN2", asset_name="Gage")
+            ],
+        )
+        reporter.save_csv_report([result], self.path)
+        (row,) = self._rows()
+        self.assertEqual(row["confidence"], "0.88")
+        self.assertEqual(row["mismatches"], "SN1: $10.0 vs $12.0")
+        self.assertEqual(row["missing_items"], "SN2 (Gage)")
+        self.assertEqual(row["service_order_id"], "")
+
+    def test_rotated_report_gets_fresh_header(self):
+        result = ValidationResult(document_name="a.pdf")
+        reporter.save_csv_report([result], self.path)
+        os.rename(self.path, self.path + ".1")
+        reporter.save_csv_report([result], self.path)
+        self.assertEqual(len(self._rows()), 1)
+        with open(self.path + ".1", newline="", encoding="utf-8") as f:
+            self.assertEqual(len(list(csv.DictReader(f))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
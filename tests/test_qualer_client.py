@@ -0,0 +1,49 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import app.qualer_client as qualer_client
+
+
+class TestMakeQualerClient(unittest.TestCase):
+    def setUp(self):
+        qualer_client.reset_qualer_client()
+
+    def tearDown(self):
+        qualer_client.reset_qualer_client()
+
+    def test_concurrent_first_calls_share_one_client(self):
+        def slow_build():
+            time.sleep(0.05)
+            return object()
+
+        results = []
+        with patch.object(
+            qualer_client, "_build_qualer_client", side_effect=slow_build
+        ) as mock_build:
+            threads = [
+                threading.Thread(
+                    target=lambda: results.append(qualer_client.make_qualer_client())
+                )
+                for _ in range(8)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        mock_build.assert_called_once()
+        self.assertEqual(len({id(c) for c in results}), 1)
+
+    @patch.object(qualer_client, "_build_qualer_client", side_effect=object)
+    def test_reset_forces_rebuild(self, mock_build):
+        first = qualer_client.make_qualer_client()
+        self.assertIs(qualer_client.make_qualer_client(), first)
+        qualer_client.reset_qualer_client()
+        self.assertIsNot(qualer_client.make_qualer_client(), first)
+        self.assertEqual(mock_build.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
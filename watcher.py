@@ -39,9 +39,10 @@ _observers_lock = Lock()
 def process_pdfs(folder: WatchedFolder):
     """Process all PDFs waiting in the folder's input directory.
 
-    If a job queue is running (GUI mode), each file is submitted to the
-    pool for concurrent processing.  Otherwise (CLI mode or queue not
-    yet initialized), files are processed synchronously.
+    Both GUI and CLI mode start the job queue, so normally each file is
+    submitted to the pool for concurrent processing.  If the queue is not
+    yet initialized (or has been shut down), files are processed
+    synchronously instead.
     """
     from app.job_queue import get_queue
 
@@ -50,7 +51,7 @@ def process_pdfs(folder: WatchedFolder):
         if queue is not None:
             queue.submit(filepath, folder)
         else:
-            # Fallback: direct synchronous processing (CLI mode)
+            # Queue not initialized (or already shut down): process synchronously
             from upload import process_file
 
             process_file(filepath, folder)
@@ -217,6 +218,11 @@ def parse_args():
         "--gui", action="store_true", help="Launch with GUI (default for .exe)"
     )
     group.add_argument("--cli", action="store_true", help="Run in CLI/console mode")
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Only print PO validation reports for POs that did not pass",
+    )
     return parser.parse_args()
 
 
@@ -248,6 +254,11 @@ def launch_cli():
         sys.exit(1)
     check_connectivity()
 
+    # Process files concurrently, as in GUI mode, rather than one at a time
+    from app.job_queue import init_queue, shutdown_queue
+
+    init_queue(max_workers=get_config().max_workers)
+
     threads = []
     for folder in get_config().watched_folders:
         move_old_pdfs(folder.output_dir)
@@ -269,6 +280,8 @@ def launch_cli():
         request_shutdown()
         for thread in threads:
             thread.join(timeout=5)
+    finally:
+        shutdown_queue()
 
 
 def launch_gui():
@@ -353,6 +366,11 @@ def main():
 
     initialize()
 
+    if args.quiet:
+        from app.po_validator import reporter
+
+        reporter.VERBOSE = False
+
     # Default: .exe -> GUI, source -> CLI
     use_gui = args.gui or (getattr(sys, "frozen", False) and not args.cli)
 